@@ -0,0 +1,27 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("admin_panel", "0004_bulkuploaduser_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="bulkuploaduser",
+            name="error",
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AlterField(
+            model_name="bulkuploaduser",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("CREATED", "Created"),
+                    ("EXISTING", "Already Exists"),
+                    ("FAILED", "Failed"),
+                ],
+                max_length=20,
+            ),
+        ),
+    ]
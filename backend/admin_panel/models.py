@@ -37,7 +37,8 @@ class BulkUploadUser(models.Model):
     """Model to store users created or identified during bulk upload"""
     STATUS_CHOICES = (
         ('CREATED', 'Created'),
-        ('EXISTING', 'Already Exists')
+        ('EXISTING', 'Already Exists'),
+        ('FAILED', 'Failed')
     )
     
     task = models.ForeignKey(BulkUploadTask, on_delete=models.CASCADE, related_name='users')
@@ -46,6 +47,7 @@ class BulkUploadUser(models.Model):
     name = models.CharField(max_length=255, blank=True)
     password = models.CharField(max_length=100, blank=True)  # Only stored for new users
     status = models.CharField(max_length=20, choices=STATUS_CHOICES)
+    error = models.CharField(max_length=255, blank=True)  # Why a FAILED row was not created
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -33,7 +33,7 @@ class BulkUploadUserSerializer(serializers.ModelSerializer):
     """Serializer for users created or identified during bulk upload"""
     class Meta:
         model = BulkUploadUser
-        fields = ['id', 'username', 'email', 'name', 'password', 'status', 'created_at']
+        fields = ['id', 'username', 'email', 'name', 'password', 'status', 'error', 'created_at']
         read_only_fields = ['id', 'created_at']
 
 class BulkUploadTaskSerializer(serializers.ModelSerializer):
@@ -132,7 +132,7 @@ class AdminPostSerializer(serializers.ModelSerializer):
         return obj.comments.count()
 
     def get_likes_count(self, obj):
-        return obj.likes.count()
+        return obj.likes_count
 
     def get_is_liked(self, obj):
         request = self.context.get('request')
@@ -150,7 +150,7 @@ class AdminPostSerializer(serializers.ModelSerializer):
         return {
             'score': obj.trending_score if hasattr(obj, 'trending_score') else 0.0,
             'view_count': obj.views.count() if hasattr(obj, 'views') else 0,
-            'like_count': obj.likes.count(),
+            'like_count': obj.likes_count,
             'comment_count': obj.comments.count(),
             'share_count': obj.shares.count() if hasattr(obj, 'shares') else 0
         } 
\ No newline at end of file
@@ -4,6 +4,7 @@ from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
 from system_logs.models import SystemLog, UserRole, ModeratorAction
 from posts.models import Post, PostInteraction, Comment, PostView, Tag
 from moderation.models import Report
@@ -24,40 +25,62 @@ from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 import csv
 import io
+import itertools
+import os
 import string
-import random
-import base64
+import secrets
 import json
 from django.core.cache import cache
 import uuid
-from django.core.files.base import ContentFile
+from django.core.files.base import File
 from rest_framework.viewsets import GenericViewSet
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import PageNumberPagination, CursorPagination
 from .models import BulkUploadTask, BulkUploadUser
 import logging
 from django.http import HttpResponse
 from celery import shared_task
 from core.celery import app as celery_app
-import threading
-from django.db import transaction, DatabaseError, connection
+from django.db import transaction, DatabaseError, IntegrityError, connection
 from functools import wraps
 import asyncio
 import time
 import concurrent.futures
 from core.db.decorators import use_primary_database, UsePrimaryDatabaseMixin
-from core.db.routers import set_write_operation
+from core.db.routers import set_use_primary, set_write_operation
+from search.views import SearchViewSet
+from core.utils.encoding import b64decode, b64_to_tempfile, data_uri_payload_start
+from core.utils.ids import uuid7
 
 # Set up logger
 logger = logging.getLogger(__name__)
 
 User = get_user_model()
 
+# Fields the admin create_post endpoint rejects when missing or empty
+POST_REQUIRED_FIELDS = ('user_id', 'type', 'title', 'description')
+
+# Response for a post_stats date range with no posts
+EMPTY_POST_STATS = {
+    'total_posts': 0,
+    'post_types': {},
+    'posts_by_day': [],
+    'engagement': {
+        'total_likes': 0,
+        'total_comments': 0,
+        'avg_likes_per_post': 0,
+        'avg_comments_per_post': 0,
+    },
+    'top_authors': [],
+    'most_liked_posts': [],
+    'most_commented_posts': [],
+}
+
 def with_transaction(f):
     """Decorator to wrap a view method in a transaction with proper error handling"""
     @wraps(f)
     def wrapped(self, request, *args, **kwargs):
         # Set flag to use primary database
-        setattr(request, '_use_primary_db', True)
+        set_use_primary(True)
         # Also set global thread write operation flag
         set_write_operation(True)
         
@@ -83,7 +106,7 @@ def async_operation(f):
     @wraps(f)
     def wrapped(self, request, *args, **kwargs):
         # Set flags to use primary database
-        setattr(request, '_use_primary_db', True)
+        set_use_primary(True)
         set_write_operation(True)
         
         # For delete operations and other write operations, use this
@@ -107,6 +130,32 @@ def async_operation(f):
             executor.shutdown(wait=False)
     return wrapped
 
+def etag_matches(request, etag):
+    """Check whether the request's If-None-Match header already has ``etag``"""
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if not if_none_match:
+        return False
+    return etag in (tag.strip() for tag in if_none_match.split(','))
+
+def attach_base64_file(instance, field_name, data_uri, file_name):
+    """
+    Store a base64 data URI in ``instance.<field_name>`` without a database write
+
+    The file goes to the field's storage under a fresh uuid name that keeps the
+    extension of ``file_name``, and only the field's name is set on the
+    instance. Unsaved instances can therefore be collected and written
+    together with ``bulk_create``. Returns False if ``data_uri`` is not a
+    base64 data URI.
+    """
+    payload_start = data_uri_payload_start(data_uri)
+    if payload_start == -1:
+        return False
+    
+    ext = file_name.split('.')[-1]
+    data = File(b64_to_tempfile(data_uri, payload_start))
+    getattr(instance, field_name).save(f"{uuid7().hex}.{ext}", data, save=False)
+    return True
+
 @swagger_auto_schema(
     methods=['get'],
     operation_description="Validate API key",
@@ -141,6 +190,13 @@ class StandardResultsSetPagination(PageNumberPagination):
     page_size_query_param = 'page_size'
     max_page_size = 100
 
+class BulkTaskUsersPagination(CursorPagination):
+    """Keyset pagination for bulk task users - no COUNT(*) per page"""
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('-created_at', '-id')
+
 class AdminPanelViewSet(UsePrimaryDatabaseMixin, GenericViewSet):
     permission_classes = [APIKeyPermission]
     pagination_class = StandardResultsSetPagination
@@ -262,7 +318,7 @@ class AdminPanelViewSet(UsePrimaryDatabaseMixin, GenericViewSet):
         length = 12
         characters = string.ascii_letters + string.digits + string.punctuation
         while True:
-            password = ''.join(random.choice(characters) for i in range(length))
+            password = ''.join(secrets.choice(characters) for i in range(length))
             # Check if password has at least one uppercase, one lowercase, one digit and one special char
             if (any(c.isupper() for c in password) and
                 any(c.islower() for c in password) and
@@ -321,7 +377,7 @@ class AdminPanelViewSet(UsePrimaryDatabaseMixin, GenericViewSet):
 
             # Update task status
             task.status = 'DELETED'
-            task.save()
+            task.save(update_fields=['status', 'updated_at'])
 
             return Response(status=status.HTTP_204_NO_CONTENT)
         except BulkUploadTask.DoesNotExist:
@@ -352,10 +408,7 @@ class AdminPanelViewSet(UsePrimaryDatabaseMixin, GenericViewSet):
                 return Response({'error': 'CSV file is required'}, status=status.HTTP_400_BAD_REQUEST)
 
             # Create task record
-            task = BulkUploadTask.objects.create(
-                file_name=file_name,
-                created_by=request.user if request.user.is_authenticated else None
-            )
+            task = BulkUploadTask.objects.create(file_name=file_name)
 
             try:
                 # Try different encodings in order of likelihood
@@ -364,7 +417,7 @@ class AdminPanelViewSet(UsePrimaryDatabaseMixin, GenericViewSet):
                 
                 for encoding in encodings:
                     try:
-                        csv_data = base64.b64decode(csv_file).decode(encoding)
+                        csv_data = b64decode(csv_file).decode(encoding)
                         # Validate CSV structure
                         csv_reader = csv.reader(io.StringIO(csv_data))
                         header = next(csv_reader)  # Read header to validate structure
@@ -376,14 +429,16 @@ class AdminPanelViewSet(UsePrimaryDatabaseMixin, GenericViewSet):
                 
                 if csv_data is None:
                     task.status = 'FAILED'
-                    task.errors.append('Invalid CSV file format or encoding')
-                    task.save()
+                    task.save(update_fields=['status', 'updated_at'])
                     return Response({'error': 'Invalid CSV file format or encoding'}, status=status.HTTP_400_BAD_REQUEST)
+                
+                # Count the remaining rows with the same streaming reader
+                task.total_rows = sum(1 for _ in csv_reader)
+                task.save(update_fields=['total_rows', 'updated_at'])
 
             except Exception as e:
                 task.status = 'FAILED'
-                task.errors.append(f'Error processing CSV file: {str(e)}')
-                task.save()
+                task.save(update_fields=['status', 'updated_at'])
                 return Response({'error': f'Error processing CSV file: {str(e)}'}, status=status.HTTP_400_BAD_REQUEST)
 
             # Start background task
@@ -580,21 +635,24 @@ class AdminPanelViewSet(UsePrimaryDatabaseMixin, GenericViewSet):
             
             try:
                 # Decode base64 image
-                format, imgstr = avatar_data.split(';base64,')
+                payload_start = data_uri_payload_start(avatar_data)
+                if payload_start == -1:
+                    raise ValueError('avatar must be a base64 data URI')
                 ext = file_name.split('.')[-1]
                 
                 # Generate unique filename
-                file_name = f"{uuid.uuid4()}.{ext}"
+                file_name = f"{uuid7().hex}.{ext}"
                 
                 # Convert base64 to file
-                data = ContentFile(base64.b64decode(imgstr))
+                data = File(b64_to_tempfile(avatar_data, payload_start))
                 
                 # Delete old avatar if exists
                 if user.avatar:
                     user.avatar.delete(save=False)
                 
-                # Save new avatar
-                user.avatar.save(file_name, data, save=True)
+                # Save new avatar, writing only its column
+                user.avatar.save(file_name, data, save=False)
+                user.save(update_fields=['avatar'])
                 
                 return Response(AdminUserSerializer(user).data)
                 
@@ -761,20 +819,29 @@ class AdminPanelViewSet(UsePrimaryDatabaseMixin, GenericViewSet):
             task = BulkUploadTask.objects.get(id=task_id)
             
             # Get users from BulkUploadUser model with pagination
-            task_users = BulkUploadUser.objects.select_related('user').filter(task=task).order_by('-created_at')
+            task_users = BulkUploadUser.objects.filter(task=task)
             
             # Get task info
             task_serializer = BulkUploadTaskSerializer(task)
             
-            # Use pagination
-            page = self.paginate_queryset(task_users)
+            # Cursor pagination walks (created_at, id) without a COUNT query
+            paginator = BulkTaskUsersPagination()
+            page = paginator.paginate_queryset(task_users, request, view=self)
             serializer = BulkUploadUserSerializer(page, many=True)
             
-            # Create response data
+            # The accounts behind this page's rows, in one query
+            accounts = {
+                account['email']: account
+                for account in User.objects.filter(
+                    email__in=[user['email'] for user in serializer.data]
+                ).values('id', 'username', 'email', 'is_active')
+            }
+            
+            # Create response data; the count is of the rows being paged
             response_data = {
                 'count': task_users.count(),
-                'next': None,  # Will be set by pagination
-                'previous': None,  # Will be set by pagination
+                'next': paginator.get_next_link(),
+                'previous': paginator.get_previous_link(),
                 'results': {
                     'task': task_serializer.data,
                     'users': [{
@@ -783,18 +850,15 @@ class AdminPanelViewSet(UsePrimaryDatabaseMixin, GenericViewSet):
                         'email': user['email'],
                         'password': user['password'],
                         'name': user['name'],
+                        'status': user['status'],
+                        'error': user['error'],
                         'created_at': user['created_at'],
-                        'user_details': user['user_details']
+                        'user_details': accounts.get(user['email'])
                     } for user in serializer.data],
-                    'progress': int(task.processed_users * 100 / task.total_users) if task.total_users > 0 else 0
+                    'progress': task.progress_percentage
                 }
             }
             
-            # Get pagination data
-            paginator_response = self.get_paginated_response(serializer.data)
-            response_data['next'] = paginator_response.data.get('next')
-            response_data['previous'] = paginator_response.data.get('previous')
-            
             return Response(response_data)
             
         except BulkUploadTask.DoesNotExist:
@@ -816,27 +880,31 @@ class AdminPanelViewSet(UsePrimaryDatabaseMixin, GenericViewSet):
             return Response({'error': 'task_id is required'}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            task = BulkUploadTask.objects.get(id=task_id)
-            if task.status.lower() == 'processing':
-                # Update task status
-                task.status = 'STOPPED'
-                task.errors.append('Processing stopped manually by admin')
-                task.save()
+            # Single conditional UPDATE - no read, and atomic against the
+            # worker updating the same row
+            stopped = BulkUploadTask.objects.filter(
+                id=task_id,
+                status__iexact='processing'
+            ).update(status='STOPPED', updated_at=timezone.now())
+            
+            if stopped:
+                logger.info(f"Processing stopped manually by admin for bulk upload {task_id}")
                 
-                # Revoke Celery task
-                logger.info(f"Revoking Celery task for bulk upload {task_id}")
-                celery_app.control.revoke(str(task_id), terminate=True)
+                # Cooperative cancel: the worker checks this flag at each batch
+                # boundary and stops cleanly, instead of a broadcast revoke
+                # killing it mid-transaction
+                cache.set(f"bulk_task_cancel:{task_id}", 1, 3600)
                 
                 return Response({'message': 'Task processing stopped'})
-            else:
+            
+            if not BulkUploadTask.objects.filter(id=task_id).exists():
                 return Response(
-                    {'error': 'Task is not in processing state'},
-                    status=status.HTTP_400_BAD_REQUEST
+                    {'error': 'No such task found'},
+                    status=status.HTTP_404_NOT_FOUND
                 )
-        except BulkUploadTask.DoesNotExist:
             return Response(
-                {'error': 'No such task found'},
-                status=status.HTTP_404_NOT_FOUND
+                {'error': 'Task is not in processing state'},
+                status=status.HTTP_400_BAD_REQUEST
             )
         except Exception as e:
             logger.error(f"Error stopping bulk task: {str(e)}")
@@ -965,18 +1033,16 @@ class AdminPanelViewSet(UsePrimaryDatabaseMixin, GenericViewSet):
     def delete_post(self, request, pk=None):
         """Delete a post with proper transaction management"""
         try:
-            # Check if post exists first to avoid acquiring lock unnecessarily
-            if not Post.objects.filter(id=pk).exists():
-                return Response({'error': 'Post not found'}, status=status.HTTP_404_NOT_FOUND)
-            
-            # Lock the post record to prevent concurrent modification
+            # Lock the post record to prevent concurrent modification. Only the
+            # columns needed for logging are fetched; a missing post raises
+            # Post.DoesNotExist, handled below.
             with transaction.atomic():
-                post = Post.objects.select_for_update().get(id=pk)
+                post = Post.objects.select_for_update().only('id', 'title', 'author_id').get(id=pk)
                 
                 # Store info for logging
                 post_id = post.id
                 post_title = post.title
-                author_id = post.author.id if post.author else None
+                author_id = post.author_id
                 
                 # Log the action before deletion
                 logger.info(f"Admin deleting post {post_title} (ID: {post_id})")
@@ -1085,15 +1151,22 @@ class AdminPanelViewSet(UsePrimaryDatabaseMixin, GenericViewSet):
             return Response({'error': 'operation_id is required'}, status=status.HTTP_400_BAD_REQUEST)
         
         try:
-            # Get progress from cache
-            total = cache.get(f"bulk_delete_{operation_id}_total")
-            completed = cache.get(f"bulk_delete_{operation_id}_completed")
-            op_status = cache.get(f"bulk_delete_{operation_id}_status")
-            errors = cache.get(f"bulk_delete_{operation_id}_errors", [])
+            # Get progress from cache in one round-trip
+            prefix = f"bulk_delete_{operation_id}_"
+            values = cache.get_many([f"{prefix}total", f"{prefix}completed", f"{prefix}status", f"{prefix}errors"])
+            total = values.get(f"{prefix}total")
+            completed = values.get(f"{prefix}completed")
+            op_status = values.get(f"{prefix}status")
+            errors = values.get(f"{prefix}errors", [])
             
             if total is None:
                 return Response({'error': 'Operation not found or expired'}, status=status.HTTP_404_NOT_FOUND)
             
+            # Pollers that already have this state get an empty 304
+            etag = f'"{operation_id}:{completed}:{op_status}"'
+            if etag_matches(request, etag):
+                return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+            
             progress = int((completed / total) * 100) if total > 0 else 0
             
             return Response({
@@ -1103,7 +1176,7 @@ class AdminPanelViewSet(UsePrimaryDatabaseMixin, GenericViewSet):
                 'completed': completed,
                 'total': total,
                 'errors': errors
-            })
+            }, headers={'ETag': etag})
             
         except Exception as e:
             logger.error(f"Error getting bulk delete status: {str(e)}", exc_info=True)
@@ -1136,10 +1209,6 @@ class AdminPanelViewSet(UsePrimaryDatabaseMixin, GenericViewSet):
     @action(detail=False, methods=['get'])
     def post_stats(self, request):
         """Get statistics about posts"""
-        from django.core.cache import cache
-        import hashlib
-        import json
-        
         # Set timeout for the database operations
         try:
             with connection.cursor() as cursor:
@@ -1169,11 +1238,18 @@ class AdminPanelViewSet(UsePrimaryDatabaseMixin, GenericViewSet):
         
         # Create cache key based on dates
         cache_key = f"post_stats_{start_date}_{end_date}"
+        
+        # The ETag is stored next to the cached stats and changes whenever they
+        # are recomputed, so a matching client skips the cached body entirely
+        etag = cache.get(f"{cache_key}_etag")
+        if etag and etag_matches(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+        
         cached_result = cache.get(cache_key)
         
         if cached_result:
             logger.info(f"Returning cached post stats for {start_date} to {end_date}")
-            return Response(cached_result)
+            return Response(cached_result, headers={'ETag': etag} if etag else None)
         
         try:
             # Get posts in date range with optimized query
@@ -1182,32 +1258,18 @@ class AdminPanelViewSet(UsePrimaryDatabaseMixin, GenericViewSet):
                 created_at__date__lte=end_date
             )
             
-            # Get the count without fetching all objects
-            total_posts = posts_query.count()
+            # Count by type - database level aggregation; the per-type counts
+            # also give the total, so no separate COUNT query is needed
+            post_types = posts_query.values('type').annotate(count=Count('id'))
+            post_types_dict = {item['type']: item['count'] for item in post_types}
+            total_posts = sum(post_types_dict.values())
             
             if total_posts == 0:
                 logger.info(f"No posts found between {start_date} and {end_date}")
-                empty_result = {
-                    'total_posts': 0,
-                    'post_types': {},
-                    'posts_by_day': [],
-                    'engagement': {
-                        'total_likes': 0,
-                        'total_comments': 0,
-                        'avg_likes_per_post': 0,
-                        'avg_comments_per_post': 0,
-                    },
-                    'top_authors': [],
-                    'most_liked_posts': [],
-                    'most_commented_posts': [],
-                }
                 # Cache the empty result for 1 hour
-                cache.set(cache_key, empty_result, 3600)
-                return Response(empty_result)
-            
-            # Count by type - database level aggregation
-            post_types = posts_query.values('type').annotate(count=Count('id'))
-            post_types_dict = {item['type']: item['count'] for item in post_types}
+                etag = f'"{cache_key}:empty"'
+                cache.set_many({cache_key: EMPTY_POST_STATS, f"{cache_key}_etag": etag}, 3600)
+                return Response(EMPTY_POST_STATS, headers={'ETag': etag})
             
             # Posts by day - database level aggregation
             posts_by_day = posts_query.annotate(
@@ -1225,12 +1287,12 @@ class AdminPanelViewSet(UsePrimaryDatabaseMixin, GenericViewSet):
             ).values('post').annotate(count=Count('*')).values('count')
             
             engagement_stats = posts_query.annotate(
-                likes_count=Coalesce(Subquery(likes_count_subquery), 0),
+                like_interactions=Coalesce(Subquery(likes_count_subquery), 0),
                 comments_count=Coalesce(Subquery(comments_count_subquery), 0)
             ).aggregate(
-                total_likes=Sum('likes_count'),
+                total_likes=Sum('like_interactions'),
                 total_comments=Sum('comments_count'),
-                avg_likes=Avg('likes_count'),
+                avg_likes=Avg('like_interactions'),
                 avg_comments=Avg('comments_count')
             )
             
@@ -1244,17 +1306,17 @@ class AdminPanelViewSet(UsePrimaryDatabaseMixin, GenericViewSet):
                 post_count=Count('id')
             ).order_by('-post_count')[:5]
             
-            # Most liked posts - use the annotated likes_count from above
+            # Most liked posts - use the annotated like interactions from above
             most_liked_posts = posts_query.annotate(
-                likes_count=Coalesce(Subquery(likes_count_subquery), 0)
-            ).order_by('-likes_count')[:5]
+                like_interactions=Coalesce(Subquery(likes_count_subquery), 0)
+            ).order_by('-like_interactions')[:5]
             
             most_liked_posts_data = [
                 {
                     'id': post.id,
                     'title': post.title,
                     'type': post.type,
-                    'likes_count': post.likes_count,
+                    'likes_count': post.like_interactions,
                     'author': post.author.username
                 }
                 for post in most_liked_posts
@@ -1292,8 +1354,9 @@ class AdminPanelViewSet(UsePrimaryDatabaseMixin, GenericViewSet):
             }
             
             # Cache the result for 30 minutes
-            cache.set(cache_key, result, 30 * 60)
-            return Response(result)
+            etag = f'"{cache_key}:{int(time.time())}"'
+            cache.set_many({cache_key: result, f"{cache_key}_etag": etag}, 30 * 60)
+            return Response(result, headers={'ETag': etag})
             
         except Exception as e:
             logger.error(f"Error getting post stats: {str(e)}", exc_info=True)
@@ -1369,70 +1432,62 @@ class AdminPanelViewSet(UsePrimaryDatabaseMixin, GenericViewSet):
                 'users': []
             }
 
-            # Import the SearchViewSet and simple_search function
-            try:
-                from search.views import SearchViewSet, simple_search
-                search_viewset = SearchViewSet()
-                
-                # Properly set the request on the viewset to ensure consistent behavior
-                search_viewset.request = request
-                search_viewset.request.path += "?admin_panel=true"  # Mark as admin panel request
+            # SearchViewSet keeps the request on the instance, so each call
+            # gets its own viewset
+            search_viewset = SearchViewSet()
+            
+            # Properly set the request on the viewset to ensure consistent behavior
+            search_viewset.request = request
+            search_viewset.request.path += "?admin_panel=true"  # Mark as admin panel request
 
-                # Get users if requested
-                if search_type in ['all', 'users']:
-                    try:
-                        users_results = search_viewset._search_users(query)
-                        
-                        if users_results:
-                            # Convert results to admin serializer format
-                            user_ids = [user['id'] for user in users_results]
-                            users = User.objects.filter(id__in=user_ids)
-                            results['users'] = AdminUserSerializer(
-                                users,
-                                many=True,
-                                context={'request': request}
-                            ).data
-                        
-                        logger.info(f"Found {len(results['users'])} users")
-                    except Exception as e:
-                        logger.error(f"Error searching users: {str(e)}", exc_info=True)
-
-                # Get posts if requested - using exact same pattern as user search
-                if search_type in ['all', 'posts']:
+            # Get users if requested
+            if search_type in ['all', 'users']:
+                try:
+                    users_results = search_viewset._search_users(query)
+                    
+                    if users_results:
+                        # Convert results to admin serializer format
+                        user_ids = [user['id'] for user in users_results]
+                        users = User.objects.filter(id__in=user_ids)
+                        results['users'] = AdminUserSerializer(
+                            users,
+                            many=True,
+                            context={'request': request}
+                        ).data
+                    
+                    logger.info(f"Found {len(results['users'])} users")
+                except Exception as e:
+                    logger.error(f"Error searching users: {str(e)}", exc_info=True)
+
+            # Get posts if requested - using exact same pattern as user search
+            if search_type in ['all', 'posts']:
+                try:
+                    posts_results = search_viewset._search_posts(query)
+                    
+                    if posts_results:
+                        # Convert results to admin serializer format
+                        post_ids = [post['id'] for post in posts_results]
+                        posts = Post.objects.filter(id__in=post_ids)
+                        results['posts'] = AdminPostSerializer(
+                            posts,
+                            many=True,
+                            context={'request': request}
+                        ).data
+                    
+                    logger.info(f"Found {len(results['posts'])} posts")
+                except Exception as e:
+                    logger.error(f"Error searching posts: {str(e)}", exc_info=True)
+                    # Provide fallback results for posts
                     try:
-                        posts_results = search_viewset._search_posts(query)
-                        
-                        if posts_results:
-                            # Convert results to admin serializer format
-                            post_ids = [post['id'] for post in posts_results]
-                            posts = Post.objects.filter(id__in=post_ids)
-                            results['posts'] = AdminPostSerializer(
-                                posts,
-                                many=True,
-                                context={'request': request}
-                            ).data
-                        
-                        logger.info(f"Found {len(results['posts'])} posts")
-                    except Exception as e:
-                        logger.error(f"Error searching posts: {str(e)}", exc_info=True)
-                        # Provide fallback results for posts
-                        try:
-                            trending_posts = Post.objects.order_by('-created_at')[:5]
-                            results['posts'] = AdminPostSerializer(
-                                trending_posts,
-                                many=True,
-                                context={'request': request}
-                            ).data
-                            logger.info(f"Using {len(results['posts'])} trending posts as fallback after search error")
-                        except Exception as fallback_error:
-                            logger.error(f"Error getting fallback posts: {str(fallback_error)}")
-            except ImportError as e:
-                logger.error(f"ImportError in admin search: {str(e)}", exc_info=True)
-                return Response({
-                    'success': False,
-                    'message': "Search functionality unavailable",
-                    'data': results
-                }, status=500)
+                        trending_posts = Post.objects.order_by('-created_at')[:5]
+                        results['posts'] = AdminPostSerializer(
+                            trending_posts,
+                            many=True,
+                            context={'request': request}
+                        ).data
+                        logger.info(f"Using {len(results['posts'])} trending posts as fallback after search error")
+                    except Exception as fallback_error:
+                        logger.error(f"Error getting fallback posts: {str(fallback_error)}")
 
             return Response({
                 'success': True,
@@ -1467,7 +1522,10 @@ class AdminPanelViewSet(UsePrimaryDatabaseMixin, GenericViewSet):
             },
             required=['user_id', 'type', 'title', 'description']
         ),
-        responses={201: AdminPostSerializer()}
+        responses={
+            201: AdminPostSerializer(),
+            202: "Post with media accepted; it is created in the background under the returned post_id"
+        }
     )
     @action(detail=False, methods=['post'])
     def create_post(self, request):
@@ -1479,90 +1537,63 @@ class AdminPanelViewSet(UsePrimaryDatabaseMixin, GenericViewSet):
             title = request.data.get('title')
             description = request.data.get('description')
             
-            # Validate required fields
-            if not user_id:
-                return Response({'error': 'user_id is required'}, status=status.HTTP_400_BAD_REQUEST)
-            if not post_type:
-                return Response({'error': 'type is required'}, status=status.HTTP_400_BAD_REQUEST)
-            if not title:
-                return Response({'error': 'title is required'}, status=status.HTTP_400_BAD_REQUEST)
-            if not description:
-                return Response({'error': 'description is required'}, status=status.HTTP_400_BAD_REQUEST)
-            
-            # Get the user
-            User = get_user_model()
+            # Validate required fields, reporting every missing one at once
+            missing = [field for field in POST_REQUIRED_FIELDS if not request.data.get(field)]
+            if missing:
+                return Response(
+                    {'error': f"Missing required fields: {', '.join(missing)}", 'missing_fields': missing},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            
+            image_data = request.data.get('image')
+            file_name = request.data.get('file_name')
+            audio_data = request.data.get('audio_file')
+            audio_file_name = request.data.get('audio_file_name')
+            
+            if post_type == 'AUDIO' and (not audio_data or not audio_file_name):
+                return Response(
+                    {'error': 'audio_file and audio_file_name are required for AUDIO posts'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            has_image = bool(image_data and file_name)
+            has_audio = post_type == 'AUDIO'
+            
+            # Posts with media are decoded and stored by a Celery worker so the
+            # request thread doesn't block on the storage upload
+            if has_image or has_audio:
+                if not User.objects.filter(id=user_id).exists():
+                    return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
+                
+                post_id = str(uuid7())
+                task = create_post_with_media.delay(
+                    post_id, user_id, post_type, title, description,
+                    image_data if has_image else None, file_name if has_image else None,
+                    audio_data if has_audio else None, audio_file_name if has_audio else None
+                )
+                logger.info(f"Queued admin post {post_id} with media for user {user_id}")
+                return Response({
+                    'post_id': post_id,
+                    'task_id': task.id,
+                    'status': 'PROCESSING'
+                }, status=status.HTTP_202_ACCEPTED)
+            
+            # Get the user - only the columns the author block of
+            # AdminPostSerializer and the log line below read
             try:
-                user = User.objects.get(id=user_id)
+                user = User.objects.only(
+                    'id', 'username', 'first_name', 'last_name', 'email', 'bio', 'avatar'
+                ).get(id=user_id)
             except User.DoesNotExist:
                 return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
             
-            # Create post instance
-            post = Post(
+            # Create the text-only post
+            post = Post.objects.create(
                 author=user,
                 type=post_type,
                 title=title,
                 description=description
             )
             
-            # Handle image upload if provided
-            image_data = request.data.get('image')
-            file_name = request.data.get('file_name')
-            
-            if image_data and file_name:
-                try:
-                    # Decode base64 image
-                    if ';base64,' in image_data:
-                        format, imgstr = image_data.split(';base64,')
-                        ext = file_name.split('.')[-1]
-                        
-                        # Generate unique filename
-                        image_file_name = f"{uuid.uuid4()}.{ext}"
-                        
-                        # Convert base64 to file
-                        data = ContentFile(base64.b64decode(imgstr))
-                        
-                        # Save image
-                        post.image.save(image_file_name, data, save=False)
-                except Exception as e:
-                    return Response(
-                        {'error': f'Error processing image: {str(e)}'},
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
-            
-            # Handle audio file upload for AUDIO posts
-            if post_type == 'AUDIO':
-                audio_data = request.data.get('audio_file')
-                audio_file_name = request.data.get('audio_file_name')
-                
-                if not audio_data or not audio_file_name:
-                    return Response(
-                        {'error': 'audio_file and audio_file_name are required for AUDIO posts'},
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
-                
-                try:
-                    # Decode base64 audio
-                    if ';base64,' in audio_data:
-                        format, audiostr = audio_data.split(';base64,')
-                        ext = audio_file_name.split('.')[-1]
-                        
-                        # Generate unique filename
-                        audio_file_name = f"{uuid.uuid4()}.{ext}"
-                        
-                        # Convert base64 to file
-                        data = ContentFile(base64.b64decode(audiostr))
-                        
-                        # Save audio file
-                        post.audio_file.save(audio_file_name, data, save=False)
-                except Exception as e:
-                    return Response(
-                        {'error': f'Error processing audio file: {str(e)}'},
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
-            
-            # Save the post
-            post.save()
-            
             # Log the action
             logger.info(f"Admin created post {post.id} for user {user.username}")
             
@@ -1585,7 +1616,7 @@ class StaffManagementViewSet(UsePrimaryDatabaseMixin, viewsets.ModelViewSet):
         return User.objects.filter(
             Q(is_staff=True) | 
             Q(role__isnull=False)
-        ).select_related('role')
+        ).select_related('role', 'role__created_by')
 
     @swagger_auto_schema(
         methods=['post'],
@@ -1631,8 +1662,10 @@ class StaffManagementViewSet(UsePrimaryDatabaseMixin, viewsets.ModelViewSet):
         user.is_staff = True
         if role_type == 'SUPERUSER':
             user.is_superuser = True
-        user.save()
+        user.save(update_fields=['is_staff', 'is_superuser'])
 
+        # Reuse the loaded user so serializing role.user doesn't re-query it
+        role.user = user
         return Response(UserRoleSerializer(role).data)
 
     @swagger_auto_schema(
@@ -1654,61 +1687,91 @@ class StaffManagementViewSet(UsePrimaryDatabaseMixin, viewsets.ModelViewSet):
         UserRole.objects.filter(user=user).delete()
         user.is_staff = False
         user.is_superuser = False
-        user.save()
+        user.save(update_fields=['is_staff', 'is_superuser'])
 
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+# Shared pool for hashing bulk-upload passwords. hashlib's PBKDF2 releases the
+# GIL, so threads hash in parallel; a process pool is not an option inside
+# daemonic Celery prefork children.
+password_hash_pool = concurrent.futures.ThreadPoolExecutor(max_workers=os.cpu_count())
+
 @celery_app.task(bind=True, name="admin_panel.process_bulk_upload", max_retries=3, ignore_result=False)
 def process_bulk_upload(self, task_id, csv_data):
     """Process bulk upload in background with Celery"""
     logger.info(f"Starting bulk upload processing for task ID: {task_id}")
     try:
-        task = BulkUploadTask.objects.get(id=task_id)
+        processed_rows = 0
         
-        # Read CSV file
-        csv_file = io.StringIO(csv_data)
-        reader = list(csv.DictReader(csv_file))
+        # Task bookkeeping is done with targeted UPDATEs, never a full-row save().
+        # total_rows was counted by the view while it validated the CSV.
+        tasks = BulkUploadTask.objects.filter(id=task_id)
+        total_rows = tasks.values_list('total_rows', flat=True).first()
+        if total_rows is None:
+            logger.error(f"Bulk upload task {task_id} not found")
+            return
+        tasks.update(status='PROCESSING', updated_at=timezone.now())
         
-        # Update task with total count
-        task.total_users = len(reader)
-        task.save()
+        # Read CSV file; rows are plain lists indexed by header position
+        reader = csv.reader(io.StringIO(csv_data))
+        header = next(reader, [])
         
         # Validate CSV structure
         required_fields = {'name', 'email', 'username'}
-        if not all(field in reader[0].keys() for field in required_fields):
-            task.status = 'FAILED'
-            task.errors.append(f'CSV must contain the following fields: {", ".join(required_fields)}')
-            task.save()
+        if not all(field in header for field in required_fields):
+            logger.error(f'Task {task_id}: CSV must contain the following fields: {", ".join(required_fields)}')
+            tasks.update(status='FAILED', updated_at=timezone.now())
             return
         
+        columns = {column: index for index, column in enumerate(header)}
+        email_index = columns['email']
+        username_index = columns['username']
+        name_index = columns['name']
+        bio_index = columns.get('bio')
+        row_width = len(header)
+        
         # Process users in batches
         batch_size = 30  # Process 30 users at a time for faster processing
-        for i in range(0, len(reader), batch_size):
+        while True:
             # Check if task was stopped
-            task.refresh_from_db()
-            if task.status == 'STOPPED':
+            if cache.get(f"bulk_task_cancel:{task_id}"):
                 logger.info(f"Task {task_id} was manually stopped")
                 return
                 
-            batch = reader[i:i + batch_size]
-            batch_errors = []
+            batch = list(itertools.islice(reader, batch_size))
+            if not batch:
+                break
             batch_users = []  # Store users to create in bulk
-            batch_task_users = []  # Store BulkUploadUser objects
+            batch_task_users = []  # Store BulkUploadUser objects, parallel to batch_users
+            failed_task_users = []  # Rows that could not be created, with the reason
             
             for row in batch:
+                email = None
                 try:
+                    # Pad short rows so every column index is valid
+                    if len(row) < row_width:
+                        row = row + [''] * (row_width - len(row))
+                    
                     # Clean input data
-                    email = row['email'].strip()
-                    username = row['username'].strip()
-                    name = row['name'].strip()
+                    email = row[email_index].strip()
+                    username = row[username_index].strip()
+                    name = row[name_index].strip()
                     
-                    # Check if user already exists
-                    if User.objects.filter(Q(email=email) | Q(username=username)).exists():
-                        batch_errors.append(f"User with email {email} or username {username} already exists - skipped")
+                    if not email or not username:
+                        failed_task_users.append(
+                            BulkUploadUser(
+                                task_id=task_id,
+                                email=email,
+                                username=username,
+                                name=name,
+                                status='FAILED',
+                                error='Email is required' if not email else 'Username is required'
+                            )
+                        )
                         continue
                     
                     # Generate password
-                    password = ''.join(random.choices(string.ascii_letters + string.digits, k=10))
+                    password = secrets.token_urlsafe(8)
                     
                     # Create user instance
                     user = User(
@@ -1718,8 +1781,8 @@ def process_bulk_upload(self, task_id, csv_data):
                     )
                     
                     # Set optional fields if provided
-                    if 'bio' in row and row['bio'].strip():
-                        user.bio = row['bio'].strip()
+                    if bio_index is not None and row[bio_index].strip():
+                        user.bio = row[bio_index].strip()
                     
                     # Handle name
                     name_parts = name.split(' ', 1)
@@ -1727,70 +1790,111 @@ def process_bulk_upload(self, task_id, csv_data):
                     if len(name_parts) > 1:
                         user.last_name = name_parts[1]
                     
-                    # Set the password
-                    user.set_password(password)
-                    
                     batch_users.append(user)
                     batch_task_users.append(
                         BulkUploadUser(
-                            task=task,
+                            task_id=task_id,
                             email=email,
                             username=username,
                             password=password,  # Store plain password for admin reference
-                            name=name
+                            name=name,
+                            status='CREATED'
                         )
                     )
                     
                 except Exception as e:
-                    error_msg = f"Error creating user {row.get('email', 'unknown')}: {str(e)}"
-                    logger.error(error_msg)
-                    batch_errors.append(error_msg)
+                    logger.error(f"Error creating user {email or 'unknown'}: {str(e)}")
+                    failed_task_users.append(
+                        BulkUploadUser(
+                            task_id=task_id,
+                            email=(email or '')[:254],
+                            username='',
+                            name='',
+                            status='FAILED',
+                            error=str(e)[:255]
+                        )
+                    )
+            
+            # One lookup finds the rows that clash with existing accounts or
+            # with an earlier row of this CSV; they are reported, not inserted
+            taken = User.objects.filter(
+                Q(email__in=[user.email for user in batch_users]) |
+                Q(username__in=[user.username for user in batch_users])
+            ).values_list('email', 'username')
+            taken_emails = {email for email, _ in taken}
+            taken_usernames = {username for _, username in taken}
+            new_users = []
+            new_task_users = []
+            for user, task_user in zip(batch_users, batch_task_users):
+                if user.email in taken_emails:
+                    task_user.error = 'Email already in use'
+                elif user.username in taken_usernames:
+                    task_user.error = 'Username already taken'
+                else:
+                    taken_emails.add(user.email)
+                    taken_usernames.add(user.username)
+                    new_users.append(user)
+                    new_task_users.append(task_user)
+                    continue
+                task_user.status = 'FAILED'
+                task_user.password = ''
+                failed_task_users.append(task_user)
+            
+            # PBKDF2 dominates this task; hash the whole batch in parallel
+            # before opening the transaction
+            hashed_passwords = password_hash_pool.map(
+                make_password, [task_user.password for task_user in new_task_users]
+            )
+            for user, hashed_password in zip(new_users, hashed_passwords):
+                user.password = hashed_password
             
             try:
-                # Bulk create users
-                if batch_users:
-                    created_users = User.objects.bulk_create(batch_users)
-                    
-                    # Update task users with created user references
-                    for i, user in enumerate(created_users):
-                        batch_task_users[i].user = user
-                    
-                    # Bulk create task users
-                    BulkUploadUser.objects.bulk_create(batch_task_users)
-                    
-                    # Update task progress
-                    task.processed_users += len(created_users)
-                    task.errors.extend(batch_errors)
-                    task.save()
+                with transaction.atomic():
+                    if new_users:
+                        try:
+                            with transaction.atomic():
+                                User.objects.bulk_create(new_users, batch_size=500)
+                        except IntegrityError:
+                            # Another writer took an email or username since the
+                            # lookup; insert row by row to find out which
+                            for user, task_user in zip(new_users, new_task_users):
+                                try:
+                                    with transaction.atomic():
+                                        user.save(force_insert=True)
+                                except IntegrityError:
+                                    task_user.status = 'FAILED'
+                                    task_user.password = ''
+                                    task_user.error = 'Email or username already taken'
                     
-                    # Log progress
-                    progress = int(task.processed_users * 100 / task.total_users) if task.total_users > 0 else 0
-                    logger.info(f"Task {task_id} progress: {progress}% ({task.processed_users}/{task.total_users})")
+                    BulkUploadUser.objects.bulk_create(new_task_users + failed_task_users, batch_size=500)
+                
             except Exception as e:
-                error_msg = f"Error in bulk creation: {str(e)}"
-                logger.error(error_msg)
-                batch_errors.append(error_msg)
-                task.errors.extend(batch_errors)
-                task.save()
+                logger.error(f"Error in bulk creation for task {task_id}: {str(e)}")
+                continue
+            
+            # Atomic progress increment; a stopped task matches no row
+            processed_rows += len(batch)
+            if not tasks.exclude(status='STOPPED').update(
+                processed_rows=F('processed_rows') + len(batch),
+                updated_at=timezone.now()
+            ):
+                logger.info(f"Task {task_id} was manually stopped")
+                return
+            
+            # Log progress
+            progress = int(processed_rows * 100 / total_rows) if total_rows > 0 else 0
+            logger.info(f"Task {task_id} progress: {progress}% ({processed_rows}/{total_rows})")
         
         # Mark as complete if any users were processed
-        if task.processed_users > 0:
-            task.status = 'COMPLETED'
-        else:
-            task.status = 'FAILED'
-            if not task.errors:
-                task.errors.append('No users were processed successfully')
-        task.save()
-        logger.info(f"Task {task_id} completed with status {task.status}")
+        final_status = 'COMPLETED' if processed_rows > 0 else 'FAILED'
+        tasks.filter(status='PROCESSING').update(status=final_status, updated_at=timezone.now())
+        logger.info(f"Task {task_id} completed with status {final_status}")
         
     except Exception as e:
         error_msg = f"Error processing bulk upload: {str(e)}"
         logger.error(error_msg)
         try:
-            task = BulkUploadTask.objects.get(id=task_id)
-            task.status = 'FAILED'
-            task.errors.append(error_msg)
-            task.save()
+            BulkUploadTask.objects.filter(id=task_id).update(status='FAILED', updated_at=timezone.now())
         except Exception as inner_e:
             logger.error(f"Failed to update task status: {str(inner_e)}")
         
@@ -1834,7 +1938,7 @@ class BulkUploadViewSet(UsePrimaryDatabaseMixin, viewsets.ViewSet):
             
             try:
                 # Decode the base64 CSV file
-                csv_data = base64.b64decode(csv_file).decode('utf-8')
+                csv_data = b64decode(csv_file).decode('utf-8')
                 
                 # Parse CSV to count rows and validate structure
                 csv_reader = csv.reader(io.StringIO(csv_data))
@@ -1844,156 +1948,30 @@ class BulkUploadViewSet(UsePrimaryDatabaseMixin, viewsets.ViewSet):
                 required_columns = ['name', 'username', 'email']
                 if not all(col in header for col in required_columns):
                     task.status = 'FAILED'
-                    task.save()
+                    task.save(update_fields=['status', 'updated_at'])
                     return Response({
                         'error': f'CSV must contain columns: {", ".join(required_columns)}'
                     }, status=status.HTTP_400_BAD_REQUEST)
                 
-                # Count rows
-                rows = list(csv_reader)
-                task.total_rows = len(rows)
-                task.save()
+                # Count rows with the same streaming reader - no row list
+                task.total_rows = sum(1 for _ in csv_reader)
+                task.save(update_fields=['total_rows', 'updated_at'])
                 
-                # Start processing in background
-                self._process_csv_in_background(task.id, csv_data)
+                # Start processing in background; Celery's prefork workers
+                # provide the parallelism
+                process_bulk_upload.delay(task.id, csv_data)
                 
                 return Response(BulkUploadTaskSerializer(task).data)
                 
             except Exception as e:
                 task.status = 'FAILED'
-                task.save()
+                task.save(update_fields=['status', 'updated_at'])
                 return Response({'error': f'Error processing CSV: {str(e)}'}, 
                                status=status.HTTP_400_BAD_REQUEST)
                 
         except Exception as e:
             return Response({'error': f'Error: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
-    def _process_csv_in_background(self, task_id, csv_data):
-        """Start a background thread to process the CSV data"""
-        thread = threading.Thread(target=self._process_csv_data, args=(task_id, csv_data))
-        thread.daemon = True
-        thread.start()
-    
-    def _process_csv_data(self, task_id, csv_data):
-        """Process CSV data in a background thread"""
-        try:
-            # Get the task
-            task = BulkUploadTask.objects.get(id=task_id)
-            
-            # Check if there are any tasks in processing state
-            processing_tasks = BulkUploadTask.objects.filter(status='PROCESSING')
-            if processing_tasks.exists() and task.id != processing_tasks.first().id:
-                # Keep in waiting state, will be processed later
-                return
-            
-            # Update task status to processing
-            task.status = 'PROCESSING'
-            task.save()
-            
-            # Parse CSV
-            csv_file = io.StringIO(csv_data)
-            reader = csv.DictReader(csv_file)
-            rows = list(reader)
-            
-            # Process in batches of 20
-            batch_size = 20
-            for i in range(0, len(rows), batch_size):
-                batch = rows[i:i+batch_size]
-                
-                # Create threads for parallel processing
-                threads = []
-                for row in batch:
-                    thread = threading.Thread(
-                        target=self._process_user_row,
-                        args=(task, row)
-                    )
-                    threads.append(thread)
-                    thread.start()
-                
-                # Wait for all threads to complete
-                for thread in threads:
-                    thread.join()
-                
-                # Update processed count
-                task.processed_rows += len(batch)
-                task.save()
-            
-            # Mark task as completed
-            task.status = 'COMPLETED'
-            task.save()
-            
-            # Check if there are any waiting tasks and process the next one
-            waiting_tasks = BulkUploadTask.objects.filter(status='WAITING').order_by('created_at')
-            if waiting_tasks.exists():
-                next_task = waiting_tasks.first()
-                # We need to store the CSV data somewhere to process the next task
-                # For now, we'll just mark it as failed
-                next_task.status = 'FAILED'
-                next_task.save()
-                
-        except Exception as e:
-            logger.error(f"Error processing task {task_id}: {str(e)}")
-            try:
-                task = BulkUploadTask.objects.get(id=task_id)
-                task.status = 'FAILED'
-                task.save()
-            except:
-                pass
-    
-    def _process_user_row(self, task, row):
-        """Process a single user row from the CSV"""
-        try:
-            # Clean input data
-            email = row.get('email', '').strip()
-            username = row.get('username', '').strip()
-            name = row.get('name', '').strip()
-            
-            if not email or not username:
-                return
-            
-            # Check if user already exists
-            user_exists = User.objects.filter(Q(email=email) | Q(username=username)).exists()
-            
-            if user_exists:
-                # User already exists, just record it
-                BulkUploadUser.objects.create(
-                    task=task,
-                    username=username,
-                    email=email,
-                    name=name,
-                    status='EXISTING'
-                )
-            else:
-                # Generate a random password
-                password = ''.join(random.choices(string.ascii_letters + string.digits, k=10))
-                
-                # Create the user
-                user = User.objects.create_user(
-                    username=username,
-                    email=email,
-                    password=password
-                )
-                
-                # Set name if provided
-                if name:
-                    name_parts = name.split(' ', 1)
-                    user.first_name = name_parts[0]
-                    if len(name_parts) > 1:
-                        user.last_name = name_parts[1]
-                    user.save()
-                
-                # Record the user in our table
-                BulkUploadUser.objects.create(
-                    task=task,
-                    username=username,
-                    email=email,
-                    name=name,
-                    password=password,  # Store plain password for admin reference
-                    status='CREATED'
-                )
-        except Exception as e:
-            logger.error(f"Error processing user row: {str(e)}")
-    
     @swagger_auto_schema(
         methods=['get'],
         operation_description="Get upload task progress",
@@ -2060,46 +2038,47 @@ def bulk_delete_posts(self, post_ids, operation_id, user_id=None):
         # Process in batches to avoid memory issues
         batch_size = 50
         for i in range(0, total, batch_size):
-            batch = post_ids[i:i + min(batch_size, total - i)]
-            
-            # Process each post individually to handle errors gracefully
-            for post_id in batch:
+            batch = []
+            for post_id in post_ids[i:i + min(batch_size, total - i)]:
                 try:
-                    with transaction.atomic():
-                        # Get post with lock
-                        try:
-                            post = Post.objects.select_for_update(nowait=True).get(id=post_id)
-                        except Post.DoesNotExist:
-                            errors.append(f"Post {post_id} not found")
-                            continue
-                        
-                        # Create ModeratorAction
-                        if admin_user:
-                            ModeratorAction.objects.create(
+                    batch.append(uuid.UUID(str(post_id)))
+                except ValueError:
+                    errors.append(f"Post {post_id} not found")
+            if not batch:
+                continue
+            
+            try:
+                with transaction.atomic():
+                    # Rows needed for the audit records and not-found reporting
+                    posts = list(Post.objects.filter(id__in=batch).values_list('id', 'title', 'author_id'))
+                    found_ids = {post[0] for post in posts}
+                    errors.extend(f"Post {post_id} not found" for post_id in batch if post_id not in found_ids)
+                    
+                    # One cascading DELETE for the whole batch
+                    Post.objects.filter(id__in=found_ids).delete()
+                    
+                    # One multi-row INSERT for the batch's audit records; if it
+                    # fails, the batch's delete is rolled back with it
+                    if admin_user and posts:
+                        ModeratorAction.objects.bulk_create([
+                            ModeratorAction(
                                 moderator=admin_user,
-                                action_type='POST_DELETE',
-                                target_id=str(post.id),
-                                target_type='POST',
-                                details=f"Bulk deleted post '{post.title}'"
+                                action_type='POST_REMOVE',
+                                target_user_id=author_id,
+                                reason=f"Bulk deleted post '{title}'",
+                                details={'post_id': str(post_id), 'operation_id': operation_id}
                             )
-                        
-                        # Delete the post
-                        post.delete()
-                        completed += 1
-                        
-                        # Update progress in cache
-                        cache.set(f"bulk_delete_{operation_id}_completed", completed, 3600)
-                        
-                except Exception as e:
-                    error_msg = f"Error deleting post {post_id}: {str(e)}"
-                    logger.error(error_msg)
-                    errors.append(error_msg)
-            
-            # Prevent transaction log buildup
-            transaction.commit()
+                            for post_id, title, author_id in posts
+                        ], batch_size=500)
+                
+                completed += len(posts)
                 
-            # Sleep briefly to prevent database overload
-            time.sleep(0.1)
+                # Update progress in cache
+                cache.set(f"bulk_delete_{operation_id}_completed", completed, 3600)
+            except Exception as e:
+                error_msg = f"Error deleting posts {', '.join(str(post_id) for post_id in batch)}: {str(e)}"
+                logger.error(error_msg)
+                errors.append(error_msg)
     
     except Exception as e:
         logger.error(f"Bulk deletion failed: {str(e)}", exc_info=True)
@@ -2120,3 +2099,30 @@ def bulk_delete_posts(self, post_ids, operation_id, user_id=None):
         'total': total,
         'errors': errors
     }
+
+@celery_app.task(name="admin_panel.tasks.create_post_with_media")
+def create_post_with_media(post_id, user_id, post_type, title, description,
+                           image_data=None, file_name=None, audio_data=None, audio_file_name=None):
+    """Celery task that stores an admin post's base64 media, then creates the post"""
+    post = Post(
+        id=post_id,
+        author_id=user_id,
+        type=post_type,
+        title=title,
+        description=description
+    )
+    
+    try:
+        if image_data and file_name:
+            attach_base64_file(post, 'image', image_data, file_name)
+        if audio_data and audio_file_name:
+            attach_base64_file(post, 'audio_file', audio_data, audio_file_name)
+        
+        # The only database write; the file fields already carry their paths
+        post.save()
+    except Exception as e:
+        logger.error(f"Error creating post {post_id} with media: {str(e)}", exc_info=True)
+        raise
+    
+    logger.info(f"Admin created post {post_id} for user {user_id}")
+    return {'post_id': post_id}
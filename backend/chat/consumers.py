@@ -1,178 +1,286 @@
 # chat/consumers.py
-from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.layers import get_channel_layer
 from django.contrib.auth import get_user_model
 from .models import ChatRoom, Message
+import asyncio
 import json
-import traceback
+import logging
+import time
+from collections import defaultdict
+from weakref import WeakValueDictionary
+from core.utils.encoding import json_dumps, json_loads
+from django.conf import settings
 from django.utils import timezone
 
+logger = logging.getLogger(__name__)
 User = get_user_model()
 
+# How long received chat messages are held so a burst goes out to the room
+# group as one channel-layer send
+BROADCAST_FLUSH_INTERVAL = 0.005
+
+# Identical consumer errors are logged at most once per interval (seconds)
+ERROR_LOG_INTERVAL = 60
+_error_log_times = {}
+
+
+def log_consumer_error(context, exc):
+    """
+    Log a caught consumer error at WARNING, rate-limited per distinct error.
+
+    Tracebacks are only attached when DEBUG logging is enabled, so a burst
+    of disconnects or ChannelFull errors doesn't format a stack per socket.
+    """
+    key = (context, type(exc), str(exc))
+    now = time.monotonic()
+    if now - _error_log_times.get(key, float('-inf')) < ERROR_LOG_INTERVAL:
+        return
+    if len(_error_log_times) >= 1000:
+        _error_log_times.clear()
+    _error_log_times[key] = now
+    logger.warning("%s: %s", context, exc, exc_info=logger.isEnabledFor(logging.DEBUG))
+
+# Per-process socket limits; connects beyond them are closed with 4008
+MAX_CONNECTIONS_PER_USER = getattr(settings, 'CHAT_MAX_CONNECTIONS_PER_USER', 5)
+MAX_CONNECTIONS = getattr(settings, 'CHAT_MAX_CONNECTIONS', 1000)
+
 class ChatConsumer(AsyncWebsocketConsumer):
     
-    connections = {}  # Class variable to track connections
+    # Class variable to track connections; weak so a consumer whose
+    # disconnect never ran doesn't stay alive through the registry
+    connections = WeakValueDictionary()
+    user_connection_counts = defaultdict(int)
+    connection_count = 0
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._pending_messages = []
+        self._flush_task = None
+        self._is_participant = False
+        self._counted = False
+        self._user_id_str = None
+        self._connection_key = None
+        # Group event handlers, bound once; see dispatch()
+        self._dispatch = {
+            'chat_message_batch': self.chat_message_batch,
+            'chat_message': self.chat_message,
+            'user_status': self.user_status,
+            'room_membership_changed': self.room_membership_changed,
+        }
+
+    async def dispatch(self, message):
+        """
+        Route the broadcast event types through a prebuilt table, leaving
+        websocket.* and anything else to Channels' name-based lookup.
+        """
+        handler = self._dispatch.get(message['type'])
+        if handler is not None:
+            await handler(message)
+        else:
+            await super().dispatch(message)
 
     async def connect(self):
-        print("=== WebSocket Connection Attempt ===")
+        logger.debug("WebSocket connection attempt")
         
         try:
             self.room_id = self.scope['url_route']['kwargs']['room_id']
             self.room_group_name = f'chat_{self.room_id}'
             self.user = self.scope.get('user')
 
-            print(f"Room ID: {self.room_id}")
-            print(f"User: {self.user}")
-            print(f"Is Authenticated: {self.user.is_authenticated}")
+            logger.debug("Room %s, user %s", self.room_id, self.user)
 
             # Accept the connection first
             await self.accept()
             
             # Then do the authentication and group setup
             if not self.user or not self.user.is_authenticated:
-                print("Authentication failed")
+                logger.debug("Authentication failed for room %s", self.room_id)
                 await self.close(code=4001)
                 return
 
-            # Verify room participation
-            is_participant = await self.verify_participant_async()
-            if not is_participant:
-                print(f"Access denied - Not a participant")
+            # Enforce the connection caps before spending a query on the room
+            if (self.user_connection_counts[self.user.id] >= MAX_CONNECTIONS_PER_USER
+                    or ChatConsumer.connection_count >= MAX_CONNECTIONS):
+                logger.warning("Connection limit reached, rejecting user %s in room %s", self.user.id, self.room_id)
+                await self.close(code=4008)
+                return
+            self.user_connection_counts[self.user.id] += 1
+            ChatConsumer.connection_count += 1
+            self._counted = True
+
+            # Formatted once for the socket's lifetime
+            self._user_id_str = str(self.user.id)
+            self._connection_key = f"{self._user_id_str}_{self.room_id}"
+
+            # Verify room participation once; membership changes arrive as
+            # room_membership_changed events for the rest of the socket's life
+            self._is_participant = await self.verify_participant_async()
+            if not self._is_participant:
+                logger.debug("Access denied - user %s is not a participant in room %s", self.user.id, self.room_id)
                 await self.close(code=4003)
                 return
 
-            # Add to room group
-            await self.channel_layer.group_add(
-                self.room_group_name,
-                self.channel_name
-            )
+            # The sender block of every message this socket sends; built once
+            # from the authenticated user instead of per message
+            self._sender_data = {
+                'id': self._user_id_str,
+                'username': self.user.username,
+                'avatar': self.user.avatar.url if self.user.avatar else None
+            }
 
-            print(f"Connection fully established for user {self.user.id}")
-            
             # Store the connection
-            connection_key = f"{self.user.id}_{self.room_id}"
-            if connection_key in self.connections:
-                old_connection = self.connections[connection_key]
-                print(f"Closing existing connection for {connection_key}")
-                await old_connection.close()
-            self.connections[connection_key] = self
-
-            # Broadcast user's online status
-            await self.channel_layer.group_send(
-                self.room_group_name,
-                {
-                    'type': 'user_status',
-                    'user_status': {
-                        'user_id': str(self.user.id),
-                        'status': 'online'
-                    }
-                }
-            )
-            print(f"Sent online status to group {self.room_group_name}")
+            old_connection = self.connections.get(self._connection_key)
+            if old_connection is not None:
+                # Close the old socket in the background instead of making
+                # this connection wait for its teardown
+                logger.debug("Closing existing connection for %s", self._connection_key)
+                asyncio.ensure_future(old_connection.close())
+            self.connections[self._connection_key] = self
+
+            # Join the room group and broadcast the online status concurrently;
+            # they are independent Redis operations
+            async with asyncio.TaskGroup() as tg:
+                tg.create_task(self.channel_layer.group_add(
+                    self.room_group_name,
+                    self.channel_name
+                ))
+                tg.create_task(self.channel_layer.group_send(
+                    self.room_group_name,
+                    self.user_status_event('online')
+                ))
+            logger.debug("Connection fully established for user %s in group %s", self.user.id, self.room_group_name)
 
         except Exception as e:
-            print(f"Connection error: {str(e)}")
-            traceback.print_exc()
+            log_consumer_error("Connection error", e)
             await self.close(code=4000)
 
     async def disconnect(self, close_code):
         try:
-            print(f"Disconnecting {self.channel_name} (User: {self.user.id}, Room: {self.room_id})")
+            logger.debug("Disconnecting %s (User: %s, Room: %s)", self.channel_name, self.user.id, self.room_id)
             
-            # Remove from connections dict
-            connection_key = f"{self.user.id}_{self.room_id}"
-            if connection_key in self.connections:
-                del self.connections[connection_key]
+            # Sockets rejected before authentication never joined the room
+            if self._connection_key is None:
+                return
             
-            # Update last seen
-            await self.update_last_seen_async()
+            # Remove from connections dict, unless a newer socket replaced us
+            if self.connections.get(self._connection_key) is self:
+                del self.connections[self._connection_key]
             
-            # Broadcast offline status
-            await self.channel_layer.group_send(
-                self.room_group_name,
-                {
-                    'type': 'user_status',
-                    'user_status': {
-                        'user_id': str(self.user.id),
-                        'status': 'offline',
-                        'last_seen': timezone.now().isoformat()
-                    }
-                }
-            )
+            # Deliver anything still buffered before announcing we're offline
+            if self._flush_task:
+                await self._flush_task
             
-            # Remove from room group
-            await self.channel_layer.group_discard(
-                self.room_group_name,
-                self.channel_name
-            )
-            print(f"Removed {self.channel_name} from group {self.room_group_name}")
+            # Update last seen, broadcast offline status and leave the room
+            # group concurrently
+            async with asyncio.TaskGroup() as tg:
+                tg.create_task(self.update_last_seen_async())
+                tg.create_task(self.channel_layer.group_send(
+                    self.room_group_name,
+                    self.user_status_event('offline', last_seen=timezone.now().isoformat())
+                ))
+                tg.create_task(self.channel_layer.group_discard(
+                    self.room_group_name,
+                    self.channel_name
+                ))
+            logger.debug("Removed %s from group %s", self.channel_name, self.room_group_name)
         except Exception as e:
-            print(f"Error in disconnect: {str(e)}")
-            traceback.print_exc()
+            log_consumer_error("Error in disconnect", e)
+        finally:
+            self.release_connection_slot()
+
+    def release_connection_slot(self):
+        """
+        Give back this socket's share of the connection caps, exactly once.
+        """
+        if not self._counted:
+            return
+        self._counted = False
+        ChatConsumer.connection_count -= 1
+        self.user_connection_counts[self.user.id] -= 1
+        if self.user_connection_counts[self.user.id] <= 0:
+            del self.user_connection_counts[self.user.id]
 
     async def receive(self, text_data):
-        print(f"[RECEIVE] Message from user {self.user.id} in channel {self.channel_name}")
-        print(f"[RECEIVE] Raw message: {text_data}")
+        logger.debug("Message from user %s in channel %s: %s", self.user.id, self.channel_name, text_data)
         
         message_type = None
         content = None
 
         # First try to parse as JSON
         try:
-            data = json.loads(text_data)
+            data = json_loads(text_data)
             message_type = data.get('type')
             content = data.get('content')
-            print(f"[INFO] Successfully parsed JSON message: {data}")
         except json.JSONDecodeError:
             # If not JSON, treat as raw text message
-            print(f"[INFO] Message is not JSON, treating as raw text")
             message_type = 'chat_message'
             content = text_data
 
         # Process the message
         if not message_type or not content:
-            print(f"[ERROR] Invalid message format: type={message_type}, content={content}")
+            logger.warning("Invalid message format: type=%s, content=%s", message_type, content)
             return
 
         try:
             if message_type == 'chat_message':
-                # Verify participant
-                is_participant = await self.verify_participant_async()
-                if not is_participant:
-                    print(f"[ERROR] User {self.user.id} is not a participant in room {self.room_id}")
+                # Participation was verified on connect
+                if not self._is_participant:
+                    logger.warning("User %s is not a participant in room %s", self.user.id, self.room_id)
                     return
                     
                 # Save message
                 message = await self.save_message_async(content)
-                print(f"[SUCCESS] Saved message {message.id} from {self.user.id}")
+                logger.debug("Saved message %s from %s", message.id, self.user.id)
                 
-                # Prepare message data
-                message_data = {
-                    'type': 'chat_message',
-                    'message': {
-                        'id': str(message.id),
-                        'content': message.content,
-                        'sender': {
-                            'id': str(message.sender.id),
-                            'username': message.sender.username,
-                            'avatar': message.sender.avatar.url if message.sender.avatar else None
-                        },
-                        'created_at': message.created_at.isoformat(),
-                        'is_read': message.is_read
-                    }
-                }
-                
-                print(f"[BROADCAST] Sending message to group {self.room_group_name}")
-                await self.channel_layer.group_send(
-                    self.room_group_name,
-                    message_data
-                )
-                print(f"[BROADCAST] Message sent to group")
+                # Queue the message; the flush task broadcasts the burst
+                self._pending_messages.append({
+                    'id': str(message.id),
+                    'content': message.content,
+                    'sender': self._sender_data,
+                    'created_at': message.created_at.isoformat(),
+                    'is_read': message.is_read
+                })
+                if self._flush_task is None:
+                    self._flush_task = asyncio.ensure_future(self.flush_messages())
                 
         except Exception as e:
-            print(f"[ERROR] Error processing message: {str(e)}")
-            traceback.print_exc()
+            log_consumer_error("Error processing message", e)
+
+    async def flush_messages(self):
+        """
+        Broadcast every queued message to the room group in a single send.
+        """
+        await asyncio.sleep(BROADCAST_FLUSH_INTERVAL)
+        messages, self._pending_messages = self._pending_messages, []
+        self._flush_task = None
+        try:
+            logger.debug("Sending %d message(s) to group %s", len(messages), self.room_group_name)
+            # Serialize each frame once here rather than once per recipient
+            await self.channel_layer.group_send(
+                self.room_group_name,
+                {
+                    'type': 'chat_message_batch',
+                    'frames': [
+                        json_dumps({'type': 'chat_message', 'message': message})
+                        for message in messages
+                    ]
+                }
+            )
+        except Exception as e:
+            log_consumer_error("Error broadcasting messages", e)
+
+    async def chat_message_batch(self, event):
+        """
+        Handler for chat_message_batch events. Each message is still sent to
+        the WebSocket as its own chat_message frame, already serialized.
+        """
+        try:
+            for frame in event['frames']:
+                await self.send(text_data=frame)
+        except Exception as e:
+            log_consumer_error("Error in chat_message_batch handler", e)
 
     async def chat_message(self, event):
         """
@@ -180,49 +288,67 @@ class ChatConsumer(AsyncWebsocketConsumer):
         """
         try:
             # Send message to WebSocket
-            await self.send(text_data=json.dumps(event))
+            await self.send(text_data=json_dumps(event))
         except Exception as e:
-            print(f"Error in chat_message handler: {str(e)}")
-            traceback.print_exc()
+            log_consumer_error("Error in chat_message handler", e)
+
+    async def room_membership_changed(self, event):
+        """
+        Handler for room_membership_changed events, published when
+        participants are removed from the room.
+        """
+        if self._is_participant and self._user_id_str in event['user_ids']:
+            self._is_participant = False
+            await self.close(code=4003)
 
     async def user_status(self, event):
         """
         Handler for user_status type events.
         """
         try:
-            print(f"user_status handler called in {self.channel_name}")
-            print(f"Event data: {event}")
+            logger.debug("user_status event in %s: %s", self.channel_name, event)
             
-            # Send status update to WebSocket
-            await self.send(text_data=json.dumps(event))
+            # Send the sender's pre-serialized status update to WebSocket
+            await self.send(text_data=event['frame'])
         except Exception as e:
-            print(f"Error in user_status handler: {str(e)}")
-            traceback.print_exc()
+            log_consumer_error("Error in user_status handler", e)
 
+    def user_status_event(self, status, **extra):
+        """
+        Build a user_status group event whose client frame is serialized
+        once by the sender.
+        """
+        return {
+            'type': 'user_status',
+            'frame': json_dumps({
+                'type': 'user_status',
+                'user_status': {
+                    'user_id': self._user_id_str,
+                    'status': status,
+                    **extra
+                }
+            })
+        }
+
+    # database_sync_to_async rather than the async ORM: it closes old and
+    # broken connections around each call, which a long-lived socket
+    # otherwise never does
     @database_sync_to_async
     def verify_participant_async(self):
-        return self.verify_participant()
-
-    def verify_participant(self):
-        try:
-            room = ChatRoom.objects.get(id=self.room_id)
-            return room.participants.filter(id=self.user.id).exists()
-        except ChatRoom.DoesNotExist:
-            return False
+        # A single membership query; a missing room simply matches nothing
+        return ChatRoom.objects.filter(
+            id=self.room_id,
+            participants__id=self.user.id
+        ).exists()
 
     @database_sync_to_async
     def save_message_async(self, content):
-        return self.save_message(content)
-
-    def save_message(self, content):
-        room = ChatRoom.objects.get(id=self.room_id)
         return Message.objects.create(
-            room=room,
+            room_id=self.room_id,
             sender=self.user,
             content=content
         )
 
-    @database_sync_to_async
-    def update_last_seen_async(self):
+    async def update_last_seen_async(self):
         # Implementation of update_last_seen method
         pass
\ No newline at end of file
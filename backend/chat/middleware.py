@@ -1,30 +1,60 @@
 # chat/middleware.py
-from channels.middleware import BaseMiddleware
 from channels.db import database_sync_to_async
+from channels.middleware import BaseMiddleware
+from functools import lru_cache
 from urllib.parse import parse_qs
+from django.contrib.auth import get_user_model
 from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from rest_framework_simplejwt.tokens import AccessToken, TokenError
 import logging
-import traceback
+import time
 
 logger = logging.getLogger(__name__)
 
+# Imported by the ASGI routing after django.setup(), like chat.consumers
+User = get_user_model()
+
+# Seconds a WebSocket-authenticated user stays in the Django cache; saving
+# or deleting the user drops the entry (see chat.signals)
+WS_USER_CACHE_TIMEOUT = 60
+
+
+def ws_user_cache_key(user_id):
+    """Cache key of a WebSocket-authenticated user"""
+    return f"ws_user:{user_id}"
+
+
+@lru_cache(maxsize=10000)
+def validate_token(token):
+    """
+    Verify an access token once and return (user_id, exp)
+
+    Reconnecting clients present the same token repeatedly, so the signature
+    check is memoized per process. Invalid tokens raise and are not cached;
+    callers must still compare exp against the clock.
+    """
+    access_token = AccessToken(token)
+    return access_token['user_id'], access_token['exp']
+
 class WebSocketJWTAuthMiddleware(BaseMiddleware):
     async def __call__(self, scope, receive, send):
-        from django.contrib.auth import get_user_model
-        from rest_framework_simplejwt.tokens import AccessToken, TokenError
-        
-        User = get_user_model()
-        
-        print("=== WebSocket Authentication ===")
-        print(f"Scope type: {scope['type']}")
-        print(f"Headers: {dict(scope.get('headers', []))}")
+        # Only build the header listing when it will actually be emitted;
+        # names only, so bearer tokens never reach the logs
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "WebSocket authentication: scope type %s, headers %s",
+                scope['type'], [name for name, _ in scope.get('headers', [])]
+            )
         
         # Get token from headers or query params
         token = None
         
-        # Try headers first
-        headers = dict(scope.get('headers', []))
-        auth_header = headers.get(b'authorization', b'').decode()
+        # Try headers first, stopping at the first Authorization header
+        auth_header = next(
+            (value for name, value in scope.get('headers', ()) if name == b'authorization'),
+            b''
+        ).decode()
         if auth_header.startswith('Bearer '):
             token = auth_header.split(' ')[1]
             
@@ -34,37 +64,49 @@ class WebSocketJWTAuthMiddleware(BaseMiddleware):
             query_params = parse_qs(query_string)
             token = query_params.get('token', [None])[0]
 
-        print(f"Token found: {'Yes' if token else 'No'}")
 
         try:
             if token:
                 try:
-                    access_token = AccessToken(token)
-                    user_id = access_token['user_id']
-                    print(f"Token decoded for user_id: {user_id}")
+                    # The user is only looked up (and cached) for a verified token
+                    user_id, exp = validate_token(token)
+                    if exp <= time.time():
+                        raise TokenError("Token is expired")
+                    logger.debug("Token decoded for user_id: %s", user_id)
                     
-                    user = await self.get_user(user_id, User)
+                    user = await self.get_user(user_id)
                     if user:
-                        print(f"Authenticated user: {user.username} (ID: {user.id})")
+                        logger.debug("Authenticated user: %s (ID: %s)", user.username, user.id)
                         scope['user'] = user
                     else:
-                        print(f"User not found for ID: {user_id}")
+                        logger.debug("User not found for ID: %s", user_id)
                         scope['user'] = AnonymousUser()
                 except Exception as e:
-                    print(f"Token validation error: {str(e)}")
+                    logger.debug("Token validation error: %s", e)
                     scope['user'] = AnonymousUser()
             else:
-                print("No token provided")
+                logger.debug("No token provided")
                 scope['user'] = AnonymousUser()
         except Exception as e:
-            print(f"Authentication error: {str(e)}")
+            logger.warning("Authentication error: %s", e)
             scope['user'] = AnonymousUser()
 
         return await super().__call__(scope, receive, send)
 
+    async def get_user(self, user_id):
+        """The active user with this id, or None"""
+        cache_key = ws_user_cache_key(user_id)
+        user = await cache.aget(cache_key)
+        if user is None:
+            user = await self.fetch_user(user_id)
+            if user is not None:
+                await cache.aset(cache_key, user, WS_USER_CACHE_TIMEOUT)
+        # Checked on cached users too, in case an entry outlived a deactivation
+        if user is not None and not user.is_active:
+            return None
+        return user
+
     @database_sync_to_async
-    def get_user(self, user_id, User):
-        try:
-            return User.objects.get(id=user_id)
-        except User.DoesNotExist:
-            return None
\ No newline at end of file
+    def fetch_user(self, user_id):
+        # database_sync_to_async closes stale connections around the query
+        return User.objects.filter(id=user_id, is_active=True).first()
@@ -157,8 +157,8 @@ class Message(models.Model):
         super().save(*args, **kwargs)
         
         if is_new:
-            # Update the chat room's timestamp
-            self.room.save(update_fields=['updated_at'])
+            # Update the chat room's timestamp by id, without loading the room
+            ChatRoom.objects.filter(pk=self.room_id).update(updated_at=timezone.now())
 
     def mark_as_read(self):
         """Mark the message as read and update the read timestamp."""
@@ -0,0 +1,72 @@
+# chat/signals.py
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .middleware import ws_user_cache_key
+from .models import ChatRoom
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+def notify_membership_changed(room_ids, user_ids):
+    """
+    Tell open chat sockets that these users left these rooms, so consumers
+    that cached their participant check drop the connection.
+    """
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+    event = {
+        'type': 'room_membership_changed',
+        'user_ids': [str(user_id) for user_id in user_ids]
+    }
+    for room_id in room_ids:
+        try:
+            async_to_sync(channel_layer.group_send)(f'chat_{room_id}', event)
+        except Exception as e:
+            logger.warning(f"Could not publish membership change for room {room_id}: {str(e)}")
+
+
+@receiver(m2m_changed, sender=ChatRoom.participants.through)
+def participants_removed(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Publish participant removals once the transaction commits
+    """
+    if action not in ('post_remove', 'pre_clear'):
+        return
+
+    if action == 'pre_clear':
+        # pk_set is empty for clear(); collect the affected ids before they go
+        if reverse:
+            pk_set = set(instance.chat_rooms.values_list('id', flat=True))
+        else:
+            pk_set = set(instance.participants.values_list('id', flat=True))
+    if not pk_set:
+        return
+
+    if reverse:
+        # instance is a user leaving the rooms in pk_set
+        room_ids, user_ids = pk_set, [instance.pk]
+    else:
+        # instance is a room losing the users in pk_set
+        room_ids, user_ids = [instance.pk], pk_set
+
+    transaction.on_commit(lambda: notify_membership_changed(room_ids, user_ids))
+
+
+@receiver(post_save, sender=get_user_model())
+@receiver(post_delete, sender=get_user_model())
+def drop_cached_ws_user(sender, instance, **kwargs):
+    """
+    Forget a user cached by the WebSocket middleware when it changes, so a
+    deactivated or deleted user stops authenticating new sockets
+    """
+    cache_key = ws_user_cache_key(instance.pk)
+    # After commit, so a concurrent connect can't cache the old row again
+    transaction.on_commit(lambda: cache.delete(cache_key), robust=True)
@@ -1,18 +1,41 @@
+import os
+
 from django.apps import AppConfig
 
+FILE_SYSTEM_STORAGES = frozenset({
+    'django.core.files.storage.FileSystemStorage',
+    'django.contrib.staticfiles.storage.StaticFilesStorage',
+})
+
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+    _dirs_created = False
     
     def ready(self):
         """
-        Initialize database timeouts when the application starts.
-        This helps prevent WebSocket routing timeouts and hanging connections.
+        Database timeouts come from the DATABASES connection options, so
+        startup no longer opens a connection to set them.
+        """
+        # Set a global variable to track if we're using Channels/ASGI
+        os.environ.setdefault('USING_CHANNELS', 'True')
+        self.create_storage_dirs()
+
+    @classmethod
+    def create_storage_dirs(cls):
+        """
+        Create the local static/media directories once per process,
+        skipping the ones whose files live in S3.
         """
-        # Import and call the timeout setting function
-        from core.db.routers import set_database_timeouts
-        set_database_timeouts()
-        
-        # Let's also set a global variable to track if we're using Channels/ASGI
-        import os
-        os.environ.setdefault('USING_CHANNELS', 'True') 
\ No newline at end of file
+        if cls._dirs_created:
+            return
+        from django.conf import settings
+
+        directories = list(settings.STATICFILES_DIRS)
+        if settings.STATICFILES_STORAGE in FILE_SYSTEM_STORAGES:
+            directories.append(settings.STATIC_ROOT)
+        if settings.DEFAULT_FILE_STORAGE in FILE_SYSTEM_STORAGES:
+            directories.extend(settings.MEDIA_SUBDIRS.values())
+        for directory in directories:
+            os.makedirs(directory, exist_ok=True)
+        cls._dirs_created = True
@@ -19,7 +19,19 @@ app.conf.update(
     
     # Task execution settings
     task_acks_late=True,  # Tasks are acknowledged after execution (better for retries)
-    worker_prefetch_multiplier=1,  # Don't prefetch more than one task at a time
+    worker_prefetch_multiplier=1,  # Default queue holds long tasks; don't prefetch behind them
+    
+    # Short per-request tasks go to the 'fast' queue, consumed by a worker
+    # started with -Q fast --prefetch-multiplier=8; everything else stays on
+    # the default queue
+    task_routes={
+        'posts.tasks.record_post_view': {'queue': 'fast'},
+        'posts.tasks.flush_post_views': {'queue': 'fast'},
+    },
+    
+    # Bulk CSV and base64 media payloads travel in task arguments
+    task_compression='zstd',
+    result_compression='zstd',
     
     # Result backend settings
     result_expires=3600,  # Results expire after 1 hour
@@ -48,6 +60,11 @@ app.conf.update(
             'args': (100, 10000),  # batch_size, max_users
             'options': {'expires': 7200},
         },
+        'flush-post-views': {
+            'task': 'posts.tasks.flush_post_views',
+            'schedule': 10.0,  # Every 10 seconds
+            'options': {'expires': 10},
+        },
         'update-user-interest-graphs': {
             'task': 'posts.tasks.update_user_interest_graphs',
             'schedule': crontab(minute='0', hour='0'),  # Once daily at midnight
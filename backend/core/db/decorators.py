@@ -4,7 +4,7 @@ Database-related decorators for views.
 import functools
 import logging
 from django.db import transaction
-from core.db.routers import set_write_operation
+from core.db.routers import force_primary_database, set_use_primary, set_write_operation
 
 logger = logging.getLogger(__name__)
 
@@ -24,8 +24,8 @@ def use_primary_database(view_func):
     """
     @functools.wraps(view_func)
     def wrapper(request, *args, **kwargs):
-        # Set a flag on the request to use the primary database
-        setattr(request, '_use_primary_db', True)
+        # Set the request-cycle flag to use the primary database
+        set_use_primary(True)
         
         # Also mark thread as having writes to maintain consistency
         # across the request lifecycle
@@ -46,8 +46,7 @@ def use_primary_database(view_func):
                     )
                     # Setting this global option ensures all future database operations 
                     # use the primary database for the remainder of the process
-                    from django.conf import settings
-                    settings.REPLICA_FORCE_PRIMARY_DATABASE = True
+                    force_primary_database()
                     
                     # Re-try the view function
                     return view_func(request, *args, **kwargs)
@@ -71,8 +70,8 @@ class UsePrimaryDatabaseMixin:
     """
     
     def dispatch(self, request, *args, **kwargs):
-        # Set a flag on the request to use the primary database
-        setattr(request, '_use_primary_db', True)
+        # Set the request-cycle flag to use the primary database
+        set_use_primary(True)
         
         # Mark thread as having writes
         set_write_operation(True)
@@ -90,8 +89,7 @@ class UsePrimaryDatabaseMixin:
                         error_str
                     )
                     # Force primary DB globally
-                    from django.conf import settings
-                    settings.REPLICA_FORCE_PRIMARY_DATABASE = True
+                    force_primary_database()
                     
                     # Re-try the request
                     return super().dispatch(request, *args, **kwargs)
@@ -2,40 +2,221 @@
 Database routers to properly handle read/write operations with database replicas.
 """
 import logging
+import os
 import random
 import threading
 import sys
+import time
+from bisect import bisect_right
+from collections import Counter
+from functools import lru_cache
 from django.conf import settings
+from django.db import DatabaseError, connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
 from threading import local
 
 logger = logging.getLogger(__name__)
 
-# Thread-local storage for request context
-_thread_local = local()
+# Thread-local request context: the current request, whether this request
+# cycle has written, whether its reads must use the primary, and the
+# primary's WAL position after its last write (None until looked up)
+_ctx = local()
 
 def get_current_request():
     """Get the current request from thread local storage."""
-    return getattr(_thread_local, 'request', None)
+    return getattr(_ctx, 'request', None)
 
 def set_current_request(request):
     """Set the current request in thread local storage."""
-    _thread_local.request = request
-
-# Set to track write operations in the current thread
-_write_operations = threading.local()
+    _ctx.request = request
 
 def set_write_operation(flag=True):
     """Mark that a write operation has occurred in this request cycle"""
-    _write_operations.has_write = flag
+    _ctx.has_write = flag
 
 def has_write_operation():
     """Check if a write operation has occurred in this request cycle"""
-    return getattr(_write_operations, 'has_write', False)
+    return getattr(_ctx, 'has_write', False)
+
+def set_use_primary(flag=True):
+    """Force (or stop forcing) reads in this request cycle to the primary"""
+    _ctx.use_primary = flag
+
+def set_request_context(request, has_write):
+    """
+    Set the current request and its write flag together; a request that
+    writes also reads from the primary
+    """
+    _ctx.request = request
+    _ctx.has_write = has_write
+    _ctx.use_primary = has_write
+    _ctx.write_lsn = None
+
+# A process never changes into or out of being a Celery worker, and the
+# routing flags are fixed at startup, so both are resolved once at import
+_IS_CELERY_WORKER = 'celery' in sys.argv[0].lower() or any('celery' in arg.lower() for arg in sys.argv)
+_CELERY_TASK_DB_PRIMARY = getattr(settings, 'CELERY_TASK_DB_PRIMARY', False)
+_SENSITIVE_MODELS_USE_PRIMARY = getattr(settings, 'DB_SENSITIVE_MODELS_USE_PRIMARY', False)
+_REPLICA_FORCE_PRIMARY = getattr(settings, 'REPLICA_FORCE_PRIMARY_DATABASE', False)
+_REPLICA_LSN_ROUTING = getattr(settings, 'REPLICA_LSN_ROUTING', False)
+_REPLICA_LSN_REFRESH_INTERVAL = getattr(settings, 'REPLICA_LSN_REFRESH_INTERVAL', 1.0)
+
+# Models that frequently experience read-after-write issues; lowercase names
+_SENSITIVE_MODELS = frozenset({
+    'post', 'user', 'comment', 'notification', 'postinteraction',
+    'trendingscore', 'usercontentpreference', 'userinterestgraph'
+})
+
+def force_primary_database():
+    """
+    Send all reads in this process to the primary from now on, like
+    REPLICA_FORCE_PRIMARY_DATABASE, which is only read at import
+    """
+    global _REPLICA_FORCE_PRIMARY
+    _REPLICA_FORCE_PRIMARY = True
 
 def is_celery_worker():
     """Check if current process is a Celery worker"""
-    # Check if running in a Celery worker process
-    return 'celery' in sys.argv[0].lower() or any('celery' in arg.lower() for arg in sys.argv)
+    return _IS_CELERY_WORKER
+
+@lru_cache(maxsize=1)
+def _get_replicas():
+    """Aliases of the configured read replicas, computed on first use."""
+    return tuple(db for db in settings.DATABASES if 'replica' in db)
+
+@lru_cache(maxsize=1)
+def _get_replica_cdf():
+    """
+    Cumulative replica weights from DATABASES[alias]['WEIGHT'], default 1.0,
+    so replicas on bigger hardware can take a larger share of reads.
+    """
+    cumulative = []
+    total = 0.0
+    for alias in _get_replicas():
+        total += max(float(settings.DATABASES[alias].get('WEIGHT', 1.0)), 0.0)
+        cumulative.append(total)
+    if total <= 0:
+        # No usable weights; fall back to a uniform pick
+        cumulative = [float(i + 1) for i in range(len(cumulative))]
+    return cumulative
+
+def _weighted_replica(replicas):
+    """Draw one replica with probability proportional to its weight."""
+    cumulative = _get_replica_cdf()
+    return replicas[bisect_right(cumulative, random.random() * cumulative[-1])]
+
+# Queries currently executing per replica alias, for power-of-two-choices
+_in_flight = Counter()
+_in_flight_lock = threading.Lock()
+
+def _track_in_flight(execute, sql, params, many, context):
+    """Execute wrapper counting a replica query while it runs."""
+    alias = context['connection'].alias
+    with _in_flight_lock:
+        _in_flight[alias] += 1
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        with _in_flight_lock:
+            _in_flight[alias] -= 1
+
+@receiver(connection_created)
+def install_in_flight_tracking(sender, connection, **kwargs):
+    """Track in-flight queries on every new replica connection."""
+    if connection.alias in _get_replicas() and _track_in_flight not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_track_in_flight)
+
+def _pick_replica(replicas):
+    """
+    Power of two choices: draw two replicas by weight and take the one with
+    fewer queries in flight, which avoids piling reads onto a slow replica.
+    """
+    if len(replicas) == 1:
+        return replicas[0]
+    first, second = _weighted_replica(replicas), _weighted_replica(replicas)
+    return first if _in_flight[first] <= _in_flight[second] else second
+
+def _parse_lsn(lsn):
+    """Turn a PostgreSQL LSN such as '16/B374D848' into a comparable int."""
+    if lsn is None:
+        return None
+    high, low = str(lsn).split('/')
+    return (int(high, 16) << 32) | int(low, 16)
+
+# Last WAL position each replica has replayed, refreshed in the background
+_replay_lsn = {}
+_lsn_refresher_pid = None
+_lsn_refresher_lock = threading.Lock()
+
+def _refresh_replay_lsns():
+    """Poll every replica's replay position; runs in a daemon thread."""
+    while True:
+        for alias in _get_replicas():
+            try:
+                # Same recycling as a request gets: drop the connection once
+                # it is past CONN_MAX_AGE or fails its health check
+                connections[alias].close_if_unusable_or_obsolete()
+                with connections[alias].cursor() as cursor:
+                    cursor.execute('SELECT pg_last_wal_replay_lsn()')
+                    _replay_lsn[alias] = _parse_lsn(cursor.fetchone()[0])
+            except Exception as e:
+                # Unknown position: the replica gets no read-after-write traffic
+                _replay_lsn.pop(alias, None)
+                logger.debug(f"Could not read replay LSN from {alias}: {e}")
+                try:
+                    connections[alias].close()
+                except Exception:
+                    pass
+        time.sleep(_REPLICA_LSN_REFRESH_INTERVAL)
+
+def _ensure_lsn_refresher():
+    """Start the replay LSN poller once per process, including forked workers."""
+    global _lsn_refresher_pid
+    if _lsn_refresher_pid == os.getpid():
+        return
+    with _lsn_refresher_lock:
+        if _lsn_refresher_pid != os.getpid():
+            _replay_lsn.clear()
+            threading.Thread(target=_refresh_replay_lsns, name='replica-lsn-refresher', daemon=True).start()
+            _lsn_refresher_pid = os.getpid()
+
+def _get_write_lsn():
+    """
+    The primary's WAL position covering this thread's writes, looked up once
+    after each write. None when the writes may not be visible on any replica
+    yet, i.e. inside a transaction, or when the lookup fails.
+    """
+    write_lsn = getattr(_ctx, 'write_lsn', None)
+    if write_lsn is not None:
+        return write_lsn
+    primary = connections['default']
+    if primary.in_atomic_block:
+        return None
+    try:
+        with primary.cursor() as cursor:
+            cursor.execute('SELECT pg_current_wal_lsn()')
+            write_lsn = _parse_lsn(cursor.fetchone()[0])
+    except DatabaseError as e:
+        logger.debug(f"Could not read the primary WAL position: {e}")
+        return None
+    _ctx.write_lsn = write_lsn
+    return write_lsn
+
+def _caught_up_replica(replicas):
+    """
+    A replica that has replayed this thread's writes, or None if none has.
+    """
+    _ensure_lsn_refresher()
+    write_lsn = _get_write_lsn()
+    if write_lsn is None:
+        return None
+    caught_up = [alias for alias in replicas if (_replay_lsn.get(alias) or -1) >= write_lsn]
+    if not caught_up:
+        return None
+    if len(caught_up) == len(replicas):
+        return _pick_replica(replicas)
+    return min(caught_up, key=_in_flight.__getitem__)
 
 class PrimaryReplicaRouter:
     """
@@ -51,66 +232,60 @@ class PrimaryReplicaRouter:
         For read operations, randomly select a database from all available databases.
         This allows load balancing across replicas.
         """
+        # Single-database deployments: every branch below would end at the
+        # primary anyway
+        replicas = _get_replicas()
+        if not replicas:
+            return 'default'
+        
         # Check if running in a Celery task and should use primary
-        if is_celery_worker() and getattr(settings, 'CELERY_TASK_DB_PRIMARY', False):
+        if _IS_CELERY_WORKER and _CELERY_TASK_DB_PRIMARY:
             logger.debug("Using primary database for Celery task read operation")
             return 'default'
             
-        # Check if certain models should always use primary
-        model_name = model.__name__.lower()
-        sensitive_models = [
-            'post', 'user', 'comment', 'notification', 'postinteraction', 
-            'trendingscore', 'usercontentpreference', 'userinterestgraph'
-        ]
-        
         # Models that frequently experience read-after-write issues
         # should use primary for all operations
-        if model_name in sensitive_models and hasattr(settings, 'DB_SENSITIVE_MODELS_USE_PRIMARY') and settings.DB_SENSITIVE_MODELS_USE_PRIMARY:
+        if _SENSITIVE_MODELS_USE_PRIMARY and model._meta.model_name in _SENSITIVE_MODELS:
             return 'default'
         
-        # Check if we should force the primary database
-        request = get_current_request()
-        if request and getattr(request, '_use_primary_db', False):
-            logger.debug("Forcing read operation to primary database due to _use_primary_db flag")
+        # Check if we should force the primary database; set for write-based
+        # request methods and by the primary-database decorators
+        if getattr(_ctx, 'use_primary', False):
+            logger.debug("Forcing read operation to primary database due to use_primary flag")
             return 'default'
         
-        # If there was a write operation in this thread, use primary for reads too
-        # This avoids read-after-write inconsistency
-        if has_write_operation():
-            logger.debug("Using primary database for read after write operation")
-            return 'default'
-            
         # If the settings has a flag to force primary, use it
-        if getattr(settings, 'REPLICA_FORCE_PRIMARY_DATABASE', False):
+        if _REPLICA_FORCE_PRIMARY:
             return 'default'
         
-        # Check for a hint about the request method
-        if hints.get('request_method') in ['POST', 'PUT', 'PATCH', 'DELETE']:
-            logger.debug("Using primary database for read in write-based request method")
-            return 'default'
-            
-        # If the application has replica databases configured, use them
-        available_dbs = list(settings.DATABASES.keys())
-        
         # If there's a read operation that follows a write, keep using the primary
         if hints.get('instance') and not getattr(hints['instance'], '_state', None).adding:
             return 'default'
-            
-        if len(available_dbs) > 1:
-            # If replicas are explicitly defined, prioritize them for reads
-            replicas = [db for db in available_dbs if 'replica' in db]
-            if replicas:
-                return random.choice(replicas)
         
-        # Default to the primary database if no replicas are configured
-        return 'default'
+        # If there was a write operation in this thread, only a replica that
+        # has replayed it can serve the read; otherwise use the primary.
+        # This avoids read-after-write inconsistency
+        if has_write_operation():
+            replica = _caught_up_replica(replicas) if _REPLICA_LSN_ROUTING else None
+            if replica is None:
+                logger.debug("Using primary database for read after write operation")
+                return 'default'
+            return replica
+            
+        # Replicas are explicitly defined; prioritize them for reads
+        return _pick_replica(replicas)
     
     def db_for_write(self, model, **hints):
         """
         Always send write operations to the primary database.
         """
-        # Mark that a write operation has occurred
-        set_write_operation(True)
+        # Mark that a write operation has occurred; only the first write
+        # of the request cycle needs to store the flag
+        if not getattr(_ctx, 'has_write', False):
+            _ctx.has_write = True
+        # The primary's WAL position moves with every write
+        if _REPLICA_LSN_ROUTING:
+            _ctx.write_lsn = None
         
         # All writes should go to the primary database
         return 'default'
@@ -120,16 +295,16 @@ class PrimaryReplicaRouter:
         Allow relations if both objects are using the same database or if
         either one is using the primary database.
         """
-        # If we don't know the database, allow the relation by default
-        if not hasattr(obj1, '_state') or not hasattr(obj2, '_state'):
+        try:
+            db1 = obj1._state.db
+            db2 = obj2._state.db
+        except AttributeError:
+            # If we don't know the database, allow the relation by default
             return True
             
-        # Allow relations if both objects are from the same database
-        if obj1._state.db == obj2._state.db:
-            return True
-        
-        # Allow relations if either object is from the primary database
-        if obj1._state.db == 'default' or obj2._state.db == 'default':
+        # Allow relations if both objects are from the same database, or if
+        # either object is from the primary database
+        if db1 == db2 or db1 == 'default' or db2 == 'default':
             return True
         
         return None
@@ -143,19 +318,9 @@ class PrimaryReplicaRouter:
 
 def set_database_timeouts():
     """
-    Set reasonable timeouts for database operations to prevent hanging connections.
-    This should be called during Django startup.
-    """
-    logger = logging.getLogger(__name__)
-    
-    from django.db import connections
-    
-    for connection in connections.all():
-        try:
-            with connection.cursor() as cursor:
-                # Set a default statement timeout to prevent hanging queries
-                # 10 seconds is a reasonable default for most operations
-                cursor.execute("SET statement_timeout = '10000';")  # 10 seconds
-        except Exception as e:
-            # Log but don't crash if this fails
-            logger.warning(f"Could not set timeout for connection {connection}: {e}") 
\ No newline at end of file
+    Kept for compatibility; does nothing.
+
+    Statement and lock timeouts are now passed as libpq connection options
+    in DATABASES, so PostgreSQL applies them to every connection at connect
+    time, reconnects included, without an extra query.
+    """ 
\ No newline at end of file
@@ -2,27 +2,42 @@
 Middleware for handling various application-specific issues
 """
 import logging
-from django.db import transaction
 from django.conf import settings
-from django.db.models.sql import compiler
-from core.db.routers import set_current_request, get_current_request, set_write_operation
+from django.db import DatabaseError
+from core.db.routers import (
+    set_current_request, get_current_request, set_request_context, set_use_primary, set_write_operation
+)
 
 logger = logging.getLogger(__name__)
 
-# Patch the SQL compiler to include request method in hints
-original_execute_sql = compiler.SQLCompiler.execute_sql
+# Exception classes raised for writes against a read-only replica
+_read_only_errors = []
+try:
+    from psycopg.errors import ReadOnlySqlTransaction
+    _read_only_errors.append(ReadOnlySqlTransaction)
+except ImportError:
+    pass
+try:
+    from redis.exceptions import ReadOnlyError
+    _read_only_errors.append(ReadOnlyError)
+except ImportError:
+    pass
+READ_ONLY_ERRORS = tuple(_read_only_errors)
 
-def patched_execute_sql(self, *args, **kwargs):
-    request = get_current_request()
-    if request and hasattr(self, 'query') and hasattr(self.query, 'model'):
-        # Add request method to the hints
-        if 'hints' not in kwargs:
-            kwargs['hints'] = {}
-        kwargs['hints']['request_method'] = request.method
-    return original_execute_sql(self, *args, **kwargs)
+# Request methods that mark a request as writing
+_WRITE_METHODS = frozenset({'POST', 'PUT', 'PATCH', 'DELETE'})
 
-# Apply the patch
-compiler.SQLCompiler.execute_sql = patched_execute_sql
+def is_read_only_error(exc):
+    """
+    Whether exc comes from writing to a read-only replica
+
+    Django wraps driver errors, so the original is checked via __cause__.
+    Only database errors fall back to scanning the message; any other
+    exception is rejected without being stringified.
+    """
+    if isinstance(exc, READ_ONLY_ERRORS) or isinstance(exc.__cause__, READ_ONLY_ERRORS):
+        return True
+    return isinstance(exc, DatabaseError) and 'read only' in str(exc).lower()
 
 class ThreadLocalRequestMiddleware:
     """
@@ -34,19 +49,11 @@ class ThreadLocalRequestMiddleware:
         self.get_response = get_response
         
     def __call__(self, request):
-        # Store the request in thread-local storage
+        # Store the request in thread-local storage. A write request method
+        # marks the thread as having written and sends its reads to the
+        # primary; otherwise both flags are reset
         previous_request = get_current_request()
-        set_current_request(request)
-        
-        # Reset write operations flag for this thread
-        set_write_operation(False)
-        
-        # If this is a write request method, we should use primary database
-        if request.method in ['POST', 'PUT', 'PATCH', 'DELETE']:
-            # Mark this thread as having done a write
-            set_write_operation(True)
-            # Also set the flag on the request
-            setattr(request, '_use_primary_db', True)
+        set_request_context(request, request.method in _WRITE_METHODS)
         
         try:
             response = self.get_response(request)
@@ -68,24 +75,23 @@ class ReadOnlyDbErrorMiddleware:
         self.get_response = get_response
         
     def __call__(self, request):
-        # We need to handle potential read-only errors in the database
+        # No transaction.atomic() around the whole request: it would open a
+        # transaction on the primary even for plain GETs and pin their reads
+        # there. Views that write get their transactions as usual.
         try:
-            with transaction.atomic():
-                response = self.get_response(request)
-                return response
+            return self.get_response(request)
                 
         except Exception as e:
-            error_str = str(e)
             # Check if this is a read-only error
-            if "ReadOnlyError" in error_str or "You can't write against a read only replica" in error_str:
+            if is_read_only_error(e):
                 logger.warning(
                     "Caught ReadOnlyError, retrying request with primary database: %s", 
-                    error_str
+                    e
                 )
                 
                 # Set a flag to use primary database for this request
                 # This works with our custom router to force writing to primary
-                setattr(request, '_use_primary_db', True)
+                set_use_primary(True)
                 
                 # Also set globally for the thread
                 set_write_operation(True)
@@ -138,11 +138,22 @@ SIMPLE_JWT = {
 }
 
 # Channels configuration
+# CHANNEL_LAYERS_HOSTS takes a comma-separated list of host[:port] Redis
+# shards; channels_redis hashes channels and groups across all of them
+CHANNEL_LAYERS_HOSTS = [
+    (host, int(port or 6379))
+    for host, _, port in (
+        entry.strip().partition(':')
+        for entry in os.getenv('CHANNEL_LAYERS_HOSTS', os.getenv('CHANNEL_LAYERS_HOST', 'redis')).split(',')
+        if entry.strip()
+    )
+]
+
 CHANNEL_LAYERS = {
     "default": {
         "BACKEND": "channels_redis.core.RedisChannelLayer",
         "CONFIG": {
-            "hosts": [("redis", 6379)],
+            "hosts": CHANNEL_LAYERS_HOSTS,
             "capacity": 1500,  # Increase channel capacity
             "expiry": 10,  # Message expiry in seconds
         },
@@ -167,11 +178,10 @@ STATICFILES_DIRS = [
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
-# Ensure directories exist
-for directory in [STATIC_ROOT] + STATICFILES_DIRS:
-    os.makedirs(directory, exist_ok=True)
+# Format uploaded images are re-encoded to: WEBP or JPEG
+UPLOAD_IMAGE_FORMAT = os.getenv('UPLOAD_IMAGE_FORMAT', 'WEBP')
 
-# Media subdirectories
+# Media subdirectories (created by CoreConfig.ready when stored locally)
 MEDIA_SUBDIRS = {
     'avatars': os.path.join(MEDIA_ROOT, 'avatars'),
     'audio': os.path.join(MEDIA_ROOT, 'audio'),
@@ -179,9 +189,6 @@ MEDIA_SUBDIRS = {
     'uploads': os.path.join(MEDIA_ROOT, 'uploads'),
 }
 
-for dir_path in MEDIA_SUBDIRS.values():
-    os.makedirs(dir_path, exist_ok=True)
-
 # Add WebSocket allowed origins
 CSRF_TRUSTED_ORIGINS = [
     "http://localhost:3000",
@@ -256,20 +263,44 @@ ALLOWED_HOSTS = ['*']  # For development only
 WEBSOCKET_TIMEOUT = 30  # 30 seconds timeout for overall WebSocket connections
 WEBSOCKET_ACCEPT_WAIT = 20  # 20 seconds wait for accept
 WEBSOCKET_DATABASE_TIMEOUT = 3000  # 3 seconds for database operations in WebSocket context
+CHAT_MAX_CONNECTIONS_PER_USER = int(os.getenv('CHAT_MAX_CONNECTIONS_PER_USER', 5))  # Chat sockets per user, per process
+CHAT_MAX_CONNECTIONS = int(os.getenv('CHAT_MAX_CONNECTIONS', 1000))  # Chat sockets per process
 
 # Database Timeout Settings
 DATABASE_STATEMENT_TIMEOUT = int(os.getenv('DATABASE_STATEMENT_TIMEOUT', 10000))  # 10 seconds default
 DATABASE_LOCKS_TIMEOUT = int(os.getenv('DATABASE_LOCKS_TIMEOUT', 10000))  # 10 seconds default
 
+# Seconds a database connection is kept open for reuse (0 closes it after each
+# request). core.asgi defaults this to 0, since ASGI runs sync code on
+# per-request threads whose persistent connections would never be reused
+DATABASE_CONN_MAX_AGE = int(os.getenv('DATABASE_CONN_MAX_AGE', 60))
+
+# Opt-in psycopg 3 server-side parameter binding. Django 4.2 rejects some
+# queries in this mode (parameters inside GROUP BY/annotations), so check the
+# app against it before enabling.
+DATABASE_SERVER_SIDE_BINDING = os.getenv('DATABASE_SERVER_SIDE_BINDING', 'False') == 'True'
+# With server-side binding, prepare a statement once it has run this many
+# times on a connection. Unset (None) never prepares, which is required
+# behind transaction-pooling PgBouncer.
+DATABASE_PREPARE_THRESHOLD = (
+    int(os.environ['DATABASE_PREPARE_THRESHOLD']) if os.getenv('DATABASE_PREPARE_THRESHOLD') else None
+)
+
 # Special flag to force using primary database for all operations
 # This is useful for debugging read-only errors
 REPLICA_FORCE_PRIMARY_DATABASE = False
 
+# Opt-in: after a write, send reads to a replica that has already replayed
+# it (compared by WAL position) instead of always to the primary. Each
+# process then polls replica replay positions in a background thread every
+# REPLICA_LSN_REFRESH_INTERVAL seconds, and a read after a write costs one
+# pg_current_wal_lsn() query on the primary.
+REPLICA_LSN_ROUTING = os.getenv('REPLICA_LSN_ROUTING', 'False') == 'True'
+REPLICA_LSN_REFRESH_INTERVAL = float(os.getenv('REPLICA_LSN_REFRESH_INTERVAL', 1.0))
+
 # Automatically apply shorter timeouts for WebSocket-related operations
 WEBSOCKET_DATABASE_TIMEOUT = 3000  # 3 seconds for WebSocket operations
 
-# To ensure proper timeouts are set on application startup,
-# add the following code to your AppConfig's ready() method:
-#
-# from core.db.routers import set_database_timeouts
-# set_database_timeouts() 
\ No newline at end of file
+# DATABASE_STATEMENT_TIMEOUT and DATABASE_LOCKS_TIMEOUT are passed to
+# PostgreSQL as connection options (see DATABASES in local.py/production.py),
+# so every connection, including reconnects, starts with them applied 
\ No newline at end of file
@@ -25,6 +25,15 @@ DATABASES = {
         'PASSWORD': os.environ.get('POSTGRES_PASSWORD'),
         'HOST': os.environ.get('POSTGRES_HOST'),
         'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+        # Reuse connections across requests/tasks; checked before reuse
+        'CONN_MAX_AGE': DATABASE_CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': True,
+        # Applied by the server once per connection, so no query needs a SET
+        'OPTIONS': {
+            'options': f'-c statement_timeout={DATABASE_STATEMENT_TIMEOUT} -c lock_timeout={DATABASE_LOCKS_TIMEOUT}',
+            'server_side_binding': DATABASE_SERVER_SIDE_BINDING,
+            'prepare_threshold': DATABASE_PREPARE_THRESHOLD,
+        },
     }
 }
 
@@ -38,6 +47,11 @@ AWS_DEFAULT_ACL = 'public-read'  # Make all objects publicly readable by default
 AWS_S3_VERIFY = True
 AWS_S3_CUSTOM_DOMAIN = f'{AWS_STORAGE_BUCKET_NAME}.s3.{AWS_S3_REGION_NAME}.amazonaws.com'
 AWS_QUERYSTRING_AUTH = False  # Don't add authentication parameters to URLs
+AWS_S3_ADDRESSING_STYLE = 'virtual'  # Address the bucket directly, no redirect round trip
+AWS_S3_SIGNATURE_VERSION = 's3v4'
+# Route uploads through S3 Transfer Acceleration (bucket must have it enabled)
+if os.environ.get('AWS_S3_USE_ACCELERATE_ENDPOINT', 'False') == 'True':
+    AWS_S3_ENDPOINT_URL = 'https://s3-accelerate.amazonaws.com'
 
 # Use S3 for storage only if all required credentials are provided
 if AWS_ACCESS_KEY_ID and AWS_SECRET_ACCESS_KEY and AWS_STORAGE_BUCKET_NAME and AWS_S3_REGION_NAME:
@@ -90,7 +104,7 @@ CACHES = {
                 "max_connections": 50,
                 "timeout": 20,
             },
-            "COMPRESSOR": "django_redis.compressors.zlib.ZlibCompressor",
+            "COMPRESSOR": "django_redis.compressors.zstd.ZStdCompressor",
         }
     }
 }
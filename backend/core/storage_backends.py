@@ -1,8 +1,48 @@
+import threading
+
+from boto3.s3.transfer import TransferConfig
 from django.conf import settings
 from storages.backends.s3boto3 import S3Boto3Storage
 
+MB = 1024 * 1024
+
+# Upload anything over 16MB in 16MB parts, sending up to 10 parts at once
+UPLOAD_TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=16 * MB,
+    multipart_chunksize=16 * MB,
+    max_concurrency=10,
+    use_threads=True,
+)
+
+# One boto3 session per credential set, shared by every storage instance and
+# thread, so credentials are resolved once per process. boto3 sessions are not
+# thread-safe, so resources are still built per thread, under the lock.
+_sessions = {}
+_session_lock = threading.Lock()
+
+
+class SharedSessionMixin:
+    """
+    Build the per-thread S3 resource from a process-wide boto3 session.
+    """
+
+    @property
+    def connection(self):
+        connection = getattr(self._connections, 'connection', None)
+        if connection is None:
+            with _session_lock:
+                connection = super().connection
+        return connection
+
+    def _create_session(self):
+        key = (self.session_profile, self.access_key, self.secret_key, getattr(self, 'security_token', None))
+        session = _sessions.get(key)
+        if session is None:
+            session = _sessions[key] = super()._create_session()
+        return session
+
 
-class StaticStorage(S3Boto3Storage):
+class StaticStorage(SharedSessionMixin, S3Boto3Storage):
     """
     Storage for static files.
     """
@@ -10,13 +50,14 @@ class StaticStorage(S3Boto3Storage):
     file_overwrite = True  # For static files, we want to overwrite
     default_acl = 'public-read'  # Static files need to be public
     querystring_auth = False  # Don't add auth tokens to URLs
+    transfer_config = UPLOAD_TRANSFER_CONFIG
     
     def _get_security_token(self):
         # Fix for the issue with HeadObject operation
         return None
 
 
-class MediaStorage(S3Boto3Storage):
+class MediaStorage(SharedSessionMixin, S3Boto3Storage):
     """
     Storage for user-uploaded files.
     """
@@ -24,6 +65,7 @@ class MediaStorage(S3Boto3Storage):
     file_overwrite = False  # Don't overwrite media files with the same name
     default_acl = 'public-read'  # Media files need to be public for frontend access
     querystring_auth = False  # Don't add auth tokens to URLs
+    transfer_config = UPLOAD_TRANSFER_CONFIG
     
     def _get_security_token(self):
         # Fix for the issue with HeadObject operation
@@ -0,0 +1,95 @@
+import base64
+import binascii
+import os
+from unittest import mock
+
+from django.contrib.auth.models import Group
+from django.test import SimpleTestCase
+
+from core.db import routers
+from core.db.routers import PrimaryReplicaRouter
+from core.utils import encoding
+from core.utils.encoding import b64_to_tempfile, data_uri_payload_start
+
+
+class ReplicaLsnRoutingTests(SimpleTestCase):
+    """Reads after a write only go to a replica that has replayed the write"""
+
+    def setUp(self):
+        patches = [
+            mock.patch.object(routers, '_REPLICA_LSN_ROUTING', True),
+            mock.patch.object(routers, '_get_replicas', return_value=('replica1', 'replica2')),
+            mock.patch.object(routers, '_ensure_lsn_refresher'),
+            mock.patch.object(routers, '_get_write_lsn', return_value=routers._parse_lsn('0/2000')),
+            mock.patch.dict(routers._replay_lsn, clear=True),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        # A request that started as a read and then wrote
+        routers.set_request_context(None, has_write=False)
+        routers.set_write_operation(True)
+        self.addCleanup(routers.set_request_context, None, False)
+        self.router = PrimaryReplicaRouter()
+
+    def test_replicas_behind_the_write_fall_back_to_primary(self):
+        routers._replay_lsn.update({'replica1': routers._parse_lsn('0/1000'), 'replica2': None})
+        self.assertEqual(self.router.db_for_read(Group), 'default')
+
+    def test_unknown_replay_position_falls_back_to_primary(self):
+        self.assertEqual(self.router.db_for_read(Group), 'default')
+
+    def test_caught_up_replica_serves_the_read(self):
+        routers._replay_lsn.update({'replica1': routers._parse_lsn('0/1000'), 'replica2': routers._parse_lsn('0/2000')})
+        self.assertEqual(self.router.db_for_read(Group), 'replica2')
+
+    def test_unknown_write_position_falls_back_to_primary(self):
+        routers._replay_lsn.update({'replica1': routers._parse_lsn('1/0'), 'replica2': routers._parse_lsn('1/0')})
+        with mock.patch.object(routers, '_get_write_lsn', return_value=None):
+            self.assertEqual(self.router.db_for_read(Group), 'default')
+
+    def test_routing_disabled_reads_after_write_from_primary(self):
+        routers._replay_lsn.update({'replica1': routers._parse_lsn('1/0'), 'replica2': routers._parse_lsn('1/0')})
+        with mock.patch.object(routers, '_REPLICA_LSN_ROUTING', False):
+            self.assertEqual(self.router.db_for_read(Group), 'default')
+
+    def test_parse_lsn_orders_by_wal_position(self):
+        self.assertLess(routers._parse_lsn('0/FFFFFFFF'), routers._parse_lsn('1/0'))
+        self.assertIsNone(routers._parse_lsn(None))
+
+
+class B64ToTempfileTests(SimpleTestCase):
+    """Windowed decoding gives the same bytes as decoding the payload at once"""
+
+    # Spans several windows, and is not a multiple of 3 so the payload ends in padding
+    payload = os.urandom(3 * encoding.B64_CHUNK_CHARS // 4 * 2 + 1000)
+
+    def decode(self, data, start=0):
+        with b64_to_tempfile(data, start) as decoded:
+            return decoded.read()
+
+    def test_plain_str_and_bytes(self):
+        encoded = base64.b64encode(self.payload)
+        self.assertEqual(self.decode(encoded), self.payload)
+        self.assertEqual(self.decode(bytearray(encoded)), self.payload)
+        self.assertEqual(self.decode(encoded.decode('ascii')), self.payload)
+
+    def test_wrapped_lines_carry_across_windows(self):
+        # 76-character lines put window edges mid-quantum once newlines are dropped
+        encoded = base64.encodebytes(self.payload)
+        self.assertEqual(self.decode(encoded), self.payload)
+        self.assertEqual(self.decode(encoded.replace(b'\n', b'\r\n').decode('ascii')), self.payload)
+
+    def test_small_windows(self):
+        encoded = base64.encodebytes(self.payload[:5000])
+        with mock.patch.object(encoding, 'B64_CHUNK_CHARS', 10):
+            self.assertEqual(self.decode(encoded), self.payload[:5000])
+
+    def test_data_uri_from_payload_start(self):
+        data_uri = 'data:image/png;base64,' + base64.b64encode(self.payload).decode('ascii')
+        self.assertEqual(self.decode(data_uri, data_uri_payload_start(data_uri)), self.payload)
+
+    def test_truncated_input_raises(self):
+        encoded = base64.b64encode(self.payload)[:-1]
+        with self.assertRaises(binascii.Error):
+            self.decode(encoded)
@@ -1,4 +1,7 @@
 from .response import api_response
-from .file_handlers import handle_uploaded_file
+from .file_handlers import handle_uploaded_file, store_raw
+from .ids import uuid7
+from .encoding import b64decode, b64_to_tempfile, data_uri_payload_start, json_dumps, json_loads
 
-__all__ = ['api_response', 'handle_uploaded_file'] 
\ No newline at end of file
+__all__ = ['api_response', 'handle_uploaded_file', 'store_raw', 'b64decode', 'b64_to_tempfile', 'data_uri_payload_start',
+           'json_dumps', 'json_loads', 'uuid7'] 
\ No newline at end of file
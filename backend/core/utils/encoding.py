@@ -0,0 +1,110 @@
+import json
+import logging
+import tempfile
+
+try:
+    # SIMD-accelerated drop-in for the stdlib codec
+    import pybase64 as _base64
+except ImportError:
+    import base64 as _base64
+
+try:
+    # C JSON codec; its JSONDecodeError subclasses json.JSONDecodeError
+    import orjson
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+DATA_URI_MARKER = ';base64,'
+
+# Base64 characters read per step
+B64_CHUNK_CHARS = 4 * 65536
+
+# Bytes the decoder skips (line breaks in MIME-wrapped base64 and the like).
+# They are dropped before decoding so windows can be cut on 4-character quanta
+B64_IGNORED = bytes(set(range(256)) - set(
+    b'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/='
+))
+
+# Decoded uploads larger than this spill from memory to disk
+SPOOL_MAX_MEMORY = 5 * 1024 * 1024
+
+def b64decode(data):
+    """
+    Decode base64 data with pybase64 when installed, else the stdlib codec
+
+    Args:
+        data: base64 encoded str or bytes-like object
+    """
+    return _base64.b64decode(data)
+
+def data_uri_payload_start(data_uri):
+    """
+    Return the index where the base64 payload of a data URI begins
+
+    Accepts str or bytes-like ``data:<mime>;base64,<payload>`` data and
+    returns -1 if the marker is missing. Callers pass the index on to
+    b64_to_tempfile() instead of slicing, so the payload is never copied.
+    """
+    if isinstance(data_uri, str):
+        marker = DATA_URI_MARKER
+    else:
+        marker = DATA_URI_MARKER.encode('ascii')
+    index = data_uri.find(marker)
+    if index == -1:
+        return -1
+    return index + len(marker)
+
+def b64_to_tempfile(b64_data, start=0):
+    """
+    Decode base64 data window by window into a SpooledTemporaryFile
+
+    Decoding starts at ``start``, so a data URI can be passed whole together
+    with data_uri_payload_start(). Bytes input is windowed through a
+    memoryview. Only one window is held in memory at a time, instead of
+    the whole decoded payload plus a ContentFile copy. Characters left
+    over past the last full 4-character quantum of a window are carried
+    into the next one, so wrapped base64 decodes too. The returned file
+    is rewound and ready to wrap in django.core.files.File.
+    """
+    if not isinstance(b64_data, str):
+        b64_data = memoryview(b64_data)
+    spooled = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY)
+    carry = b''
+    try:
+        for offset in range(start, len(b64_data), B64_CHUNK_CHARS):
+            window = b64_data[offset:offset + B64_CHUNK_CHARS]
+            window = window.encode('ascii') if isinstance(window, str) else bytes(window)
+            window = carry + window.translate(None, B64_IGNORED)
+            usable = len(window) - len(window) % 4
+            spooled.write(_base64.b64decode(window[:usable]))
+            carry = window[usable:]
+        if carry:
+            # Let the decoder report the truncated input
+            spooled.write(_base64.b64decode(carry))
+    except Exception:
+        spooled.close()
+        raise
+    spooled.seek(0)
+    return spooled
+
+def json_dumps(obj):
+    """
+    Serialize obj to a JSON str with orjson when installed, else the stdlib
+
+    orjson also handles datetime and UUID values natively.
+    """
+    if orjson is not None:
+        return orjson.dumps(obj).decode('utf-8')
+    return json.dumps(obj)
+
+def json_loads(data):
+    """
+    Parse JSON str or bytes with orjson when installed, else the stdlib
+
+    Raises json.JSONDecodeError on invalid input with either codec.
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
@@ -1,13 +1,163 @@
+import hashlib
 import os
-from uuid import uuid4
+from .ids import uuid7
+from django.conf import settings
+from django.core.cache import cache
 from django.core.files.storage import default_storage
-from django.core.files.base import ContentFile
+from django.core.files.base import File
 from PIL import Image
 from io import BytesIO
 import logging
 
+try:
+    # libvips: shrink-on-load, streaming, multithreaded resize/encode
+    import pyvips
+except (ImportError, OSError):
+    # OSError: the Python binding is installed but libvips itself is not
+    pyvips = None
+
 logger = logging.getLogger(__name__)
 
+# Format processed images are stored in: WEBP (default) or JPEG
+UPLOAD_IMAGE_FORMAT = getattr(settings, 'UPLOAD_IMAGE_FORMAT', 'WEBP').upper()
+IMAGE_EXTENSIONS = {'WEBP': '.webp', 'JPEG': '.jpg'}
+
+# Uploaded images are scaled down to fit within this box
+MAX_IMAGE_SIZE = (1000, 1000)
+
+# Smaller images are saved as baseline JPEGs, where progressive scans add bytes
+PROGRESSIVE_MIN_SIZE = 200
+
+# How long an encoded upload is kept for identical re-uploads, in seconds,
+# and the largest encoded size worth keeping. Encoded images don't
+# compress further, so bigger ones would only fill the cache
+UPLOAD_CACHE_TIMEOUT = 60 * 60
+UPLOAD_CACHE_MAX_SIZE = 64 * 1024
+
+# Which encoder produces processed images; part of the upload cache key
+IMAGE_ENCODER = 'vips' if pyvips is not None else 'pillow'
+
+# Bytes read per step when hashing uploads
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# Encoder options, built once. Optimized Huffman tables and 4:2:0 chroma
+# subsampling keep JPEGs small; progressive is decided per image
+PILLOW_WEBP_OPTIONS = {'format': 'WEBP', 'quality': 80, 'method': 4}
+PILLOW_JPEG_OPTIONS = {'format': 'JPEG', 'quality': 85, 'optimize': True, 'subsampling': 2}
+VIPS_WEBP_OPTIONS = {'Q': 80, 'effort': 4, 'strip': True}
+VIPS_JPEG_OPTIONS = {'Q': 85, 'optimize_coding': True, 'subsample_mode': 'on', 'strip': True}
+VIPS_THUMBNAIL_OPTIONS = {'height': MAX_IMAGE_SIZE[1], 'size': 'down'}
+
+def file_digest(file):
+    """BLAKE2b digest of an uploaded file's contents, read in chunks"""
+    digest = hashlib.blake2b(digest_size=16)
+    for chunk in file.chunks(HASH_CHUNK_SIZE):
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+def encode_image(file):
+    """
+    Decode an uploaded image, fit it within MAX_IMAGE_SIZE and encode it
+    as UPLOAD_IMAGE_FORMAT into a rewound BytesIO
+    """
+    if pyvips is not None:
+        return BytesIO(_encode_with_vips(file))
+    return _encode_with_pillow(file)
+
+def _encode_with_vips(file):
+    """libvips pipeline; thumbnailing decodes at reduced size where the format allows"""
+    if hasattr(file, 'temporary_file_path'):
+        # Large uploads are already spooled to disk; let libvips stream
+        # from the file rather than reading it into memory
+        image = pyvips.Image.thumbnail(
+            file.temporary_file_path(), MAX_IMAGE_SIZE[0], **VIPS_THUMBNAIL_OPTIONS
+        )
+    else:
+        image = pyvips.Image.thumbnail_buffer(
+            file.read(), MAX_IMAGE_SIZE[0], **VIPS_THUMBNAIL_OPTIONS
+        )
+    if image.interpretation not in ('srgb', 'b-w'):
+        image = image.colourspace('srgb')
+    
+    if UPLOAD_IMAGE_FORMAT == 'WEBP':
+        return image.webpsave_buffer(**VIPS_WEBP_OPTIONS)
+    
+    # JPEG has no alpha channel
+    if image.hasalpha():
+        image = image.flatten(background=255)
+    return image.jpegsave_buffer(
+        interlace=max(image.width, image.height) > PROGRESSIVE_MIN_SIZE,
+        **VIPS_JPEG_OPTIONS
+    )
+
+def _encode_with_pillow(file):
+    """Pillow pipeline, used when libvips is not available"""
+    img = Image.open(file)
+    
+    # Let libjpeg scale JPEGs down by 1/2, 1/4 or 1/8 while decoding,
+    # so large photos are never decoded at full size. Must run
+    # before anything loads the pixels (convert, copy, thumbnail)
+    if img.format == 'JPEG':
+        img.draft('RGB', MAX_IMAGE_SIZE)
+    
+    # Convert to RGB if necessary; WebP keeps transparency
+    mode = 'RGBA' if UPLOAD_IMAGE_FORMAT == 'WEBP' and img.has_transparency_data else 'RGB'
+    if img.mode != mode:
+        img = img.convert(mode)
+    
+    # Resize if too large (max 1000x1000)
+    if img.height > MAX_IMAGE_SIZE[1] or img.width > MAX_IMAGE_SIZE[0]:
+        img.thumbnail(MAX_IMAGE_SIZE, Image.LANCZOS)
+    
+    img_io = BytesIO()
+    if UPLOAD_IMAGE_FORMAT == 'WEBP':
+        img.save(img_io, **PILLOW_WEBP_OPTIONS)
+    else:
+        img.save(img_io, progressive=max(img.size) > PROGRESSIVE_MIN_SIZE, **PILLOW_JPEG_OPTIONS)
+    img_io.seek(0)
+    return img_io
+
+def unique_upload_path(name, directory):
+    """A fresh path in directory that keeps the extension of name"""
+    ext = os.path.splitext(name)[1].lower()
+    return f"{directory}/{uuid7().hex}{ext}"
+
+def save_processed_image(file, directory):
+    """
+    Fit an image within MAX_IMAGE_SIZE, re-encode it as UPLOAD_IMAGE_FORMAT
+    and save it under directory in default storage, returning the saved path
+    """
+    # Identical small uploads (re-uploaded avatars) reuse the encoded
+    # result instead of being decoded and resized again. Each upload
+    # still gets its own stored file, since either owner may delete
+    # theirs later
+    cache_key = f"upload:{IMAGE_ENCODER}:{UPLOAD_IMAGE_FORMAT}:{file_digest(file)}"
+    encoded = cache.get(cache_key)
+    if encoded is None:
+        img_io = encode_image(file)
+        if img_io.getbuffer().nbytes <= UPLOAD_CACHE_MAX_SIZE:
+            cache.set(cache_key, img_io.getvalue(), UPLOAD_CACHE_TIMEOUT)
+    else:
+        img_io = BytesIO(encoded)
+    
+    # Save using default storage; File hands the buffer over as-is
+    file_path = f"{directory}/{uuid7().hex}{IMAGE_EXTENSIONS[UPLOAD_IMAGE_FORMAT]}"
+    return default_storage.save(file_path, File(img_io, name=os.path.basename(file_path)))
+
+def store_raw(file, directory='uploads', is_image=True, max_size=5*1024*1024):
+    """
+    Validate an upload and save it unprocessed, so the request does not
+    wait on image processing (see posts.tasks.process_post_image)
+    """
+    if file.size > max_size:
+        raise ValueError(f"File size too large. Maximum size is {max_size/1024/1024}MB")
+    if is_image:
+        # Image.open only parses the header, enough to reject non-images
+        Image.open(file)
+        file.seek(0)
+    return default_storage.save(unique_upload_path(file.name, directory), file)
+
 def handle_uploaded_file(file, directory='uploads', is_image=True, max_size=5*1024*1024):
     """
     Handle file upload with image processing and validation
@@ -23,39 +173,14 @@ def handle_uploaded_file(file, directory='uploads', is_image=True, max_size=5*10
         if file.size > max_size:
             raise ValueError(f"File size too large. Maximum size is {max_size/1024/1024}MB")
 
-        # Generate unique filename
-        ext = os.path.splitext(file.name)[1].lower()
-        filename = f"{uuid4().hex}{ext}"
-        
-        # Full path including directory
-        file_path = f"{directory}/{filename}"
-
         if is_image:
-            # Process image
-            img = Image.open(file)
-            
-            # Convert to RGB if necessary
-            if img.mode != 'RGB':
-                img = img.convert('RGB')
-            
-            # Resize if too large (max 1000x1000)
-            if img.height > 1000 or img.width > 1000:
-                output_size = (1000, 1000)
-                img.thumbnail(output_size)
-            
-            # Save to BytesIO
-            img_io = BytesIO()
-            img.save(img_io, format='JPEG', quality=85)
-            img_io.seek(0)
-            
-            # Save using default storage
-            saved_path = default_storage.save(file_path, ContentFile(img_io.getvalue()))
+            saved_path = save_processed_image(file, directory)
         else:
-            # Save non-image file directly
-            saved_path = default_storage.save(file_path, file)
+            # Save non-image file directly, under a unique filename
+            saved_path = default_storage.save(unique_upload_path(file.name, directory), file)
 
         return saved_path
 
     except Exception as e:
         logger.error(f"Error handling uploaded file: {str(e)}")
-        raise 
\ No newline at end of file
+        raise
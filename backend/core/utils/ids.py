@@ -0,0 +1,17 @@
+import os
+import time
+import uuid
+
+
+def uuid7():
+    """
+    A time-ordered UUID (RFC 9562 version 7)
+    The leading 48 bits are the Unix time in milliseconds, so new ids sort
+    after older ones and primary key inserts land on the right edge of the index
+    """
+    value = (time.time_ns() // 1_000_000 & 0xFFFF_FFFF_FFFF) << 80
+    value |= int.from_bytes(os.urandom(10), 'big')
+    # Version 7 in bits 76-79, RFC 4122 variant in bits 62-63
+    value = (value & ~(0xF << 76)) | (0x7 << 76)
+    value = (value & ~(0x3 << 62)) | (0x2 << 62)
+    return uuid.UUID(int=value)
@@ -1,5 +1,4 @@
-import psycopg2
-from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+import psycopg
 import logging
 
 # Configure logging
@@ -24,8 +23,7 @@ def create_database():
     try:
         # Connect to default postgres database first
         logger.info("Connecting to default postgres database...")
-        conn = psycopg2.connect(**INITIAL_DB_PARAMS, dbname='postgres')
-        conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+        conn = psycopg.connect(**INITIAL_DB_PARAMS, dbname='postgres', autocommit=True)
         cursor = conn.cursor()
         
         # Check if our database exists
@@ -55,8 +53,7 @@ def test_rds_connection():
             
         # Now connect to our database
         logger.info("Attempting to connect to neuhu database...")
-        conn = psycopg2.connect(**DB_PARAMS)
-        conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+        conn = psycopg.connect(**DB_PARAMS, autocommit=True)
         cursor = conn.cursor()
         
         # Create a test table
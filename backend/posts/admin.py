@@ -9,9 +9,6 @@ class PostAdmin(admin.ModelAdmin):
     readonly_fields = ('created_at', 'updated_at')
     date_hierarchy = 'created_at'
 
-    def likes_count(self, obj):
-        return obj.likes.count()
-
 @admin.register(Comment)
 class CommentAdmin(admin.ModelAdmin):
     list_display = ('id', 'author', 'post', 'content', 'created_at')
@@ -1,5 +1,17 @@
+import logging
+import os
+
 from django.apps import AppConfig
 
+logger = logging.getLogger(__name__)
+
+# Tables whose absence disables a feature, with the warning to log for each
+OPTIONAL_TABLES = {
+    'posts_tag': "Posts Tag model may not be migrated yet. Run migrations to enable tag functionality.",
+    'posts_usercontentpreference': "UserContentPreference model may not be migrated yet. Run migrations to enable personalized feeds.",
+    'posts_userinterestgraph': "UserInterestGraph model may not be migrated yet. Run migrations to enable advanced suggestions.",
+}
+
 
 class PostsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
@@ -13,37 +25,25 @@ class PostsConfig(AppConfig):
         # Import signal handlers
         import posts.signals
         
-        # Set up models that might not have been migrated yet
+        # Only warn about unmigrated tables in development (the autoreloader
+        # child or DEBUG), not in every production worker at boot
+        from django.conf import settings
+        if os.environ.get('RUN_MAIN') or settings.DEBUG:
+            self.check_optional_tables()
+
+    def check_optional_tables(self):
+        """
+        Log a warning for each optional table that has not been migrated,
+        using a single table listing instead of one probe query per table.
+        """
         from django.db import connection
         from django.db.utils import ProgrammingError, OperationalError
-        
-        # Check and potentially create Tag model if missing
-        try:
-            # Check if the model exists in the database
-            with connection.cursor() as cursor:
-                cursor.execute("SELECT * FROM posts_tag LIMIT 1")
-        except (ProgrammingError, OperationalError):
-            # Table doesn't exist, we'll log this for admin awareness
-            import logging
-            logger = logging.getLogger(__name__)
-            logger.warning("Posts Tag model may not be migrated yet. Run migrations to enable tag functionality.")
-        
-        # Check and potentially create UserContentPreference model if missing
-        try:
-            with connection.cursor() as cursor:
-                cursor.execute("SELECT * FROM posts_usercontentpreference LIMIT 1")
-        except (ProgrammingError, OperationalError):
-            # Table doesn't exist, we'll log this for admin awareness
-            import logging
-            logger = logging.getLogger(__name__)
-            logger.warning("UserContentPreference model may not be migrated yet. Run migrations to enable personalized feeds.")
-            
-        # Check and potentially create UserInterestGraph model if missing
+
         try:
-            with connection.cursor() as cursor:
-                cursor.execute("SELECT * FROM posts_userinterestgraph LIMIT 1")
+            existing = set(connection.introspection.table_names())
         except (ProgrammingError, OperationalError):
-            # Table doesn't exist, we'll log this for admin awareness
-            import logging
-            logger = logging.getLogger(__name__)
-            logger.warning("UserInterestGraph model may not be migrated yet. Run migrations to enable advanced suggestions.")
\ No newline at end of file
+            # Database not reachable yet; migrate/runserver will report it
+            return
+        for table, warning in OPTIONAL_TABLES.items():
+            if table not in existing:
+                logger.warning(warning)
@@ -0,0 +1,87 @@
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def copy_graphs_to_edges(apps, schema_editor):
+    """Turn each stored JSON graph into InterestEdge rows"""
+    UserInterestGraph = apps.get_model("posts", "UserInterestGraph")
+    InterestEdge = apps.get_model("posts", "InterestEdge")
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split("."))
+
+    for graph in UserInterestGraph.objects.iterator():
+        weights = {
+            key: weight
+            for key, weight in (graph.interest_graph or {}).items()
+            if weight and weight > 0 and key != str(graph.user_id)
+        }
+        if not weights:
+            continue
+        # Skip edges to users deleted since the graph was calculated
+        existing = {
+            str(pk)
+            for pk in User.objects.filter(id__in=list(weights)).values_list("id", flat=True)
+        }
+        InterestEdge.objects.bulk_create(
+            [
+                InterestEdge(from_user_id=graph.user_id, to_user_id=key, weight=weight)
+                for key, weight in weights.items()
+                if key in existing
+            ],
+            ignore_conflicts=True,
+        )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("posts", "0002_tag_usercontentpreference_userinterestgraph_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="InterestEdge",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("weight", models.FloatField(default=0)),
+                (
+                    "from_user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="interest_edges",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "to_user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["from_user", "-weight"],
+                        name="posts_inter_from_us_9cce26_idx",
+                    )
+                ],
+                "unique_together": {("from_user", "to_user")},
+            },
+        ),
+        migrations.RunPython(copy_graphs_to_edges, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name="userinterestgraph",
+            name="interest_graph",
+        ),
+    ]
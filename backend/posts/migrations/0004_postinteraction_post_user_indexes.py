@@ -0,0 +1,30 @@
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Build the indexes without locking writes to the table
+    atomic = False
+
+    dependencies = [
+        ("posts", "0003_interestedge"),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="postinteraction",
+            index=models.Index(
+                fields=["post", "user"], name="posts_posti_post_id_40e956_idx"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="postinteraction",
+            index=models.Index(
+                condition=models.Q(("interaction_type", "LIKE")),
+                fields=["user", "post"],
+                name="likes_user_post_idx",
+            ),
+        ),
+        # Refresh planner statistics so the new indexes are used straight away
+        migrations.RunSQL("ANALYZE posts_postinteraction", migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,29 @@
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_likes_count(apps, schema_editor):
+    """Set likes_count from the existing likes"""
+    Post = apps.get_model("posts", "Post")
+    likes = Post.likes.through.objects.filter(post_id=OuterRef("pk")).values("post_id")
+    Post.objects.update(
+        likes_count=Coalesce(
+            Subquery(likes.annotate(count=Count("*")).values("count")), 0
+        )
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("posts", "0004_postinteraction_post_user_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="post",
+            name="likes_count",
+            field=models.PositiveIntegerField(db_index=True, default=0),
+        ),
+        migrations.RunPython(backfill_likes_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+import core.utils.ids
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("posts", "0005_post_likes_count"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="post",
+            name="id",
+            field=models.UUIDField(
+                default=core.utils.ids.uuid7,
+                editable=False,
+                primary_key=True,
+                serialize=False,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="comment",
+            name="id",
+            field=models.UUIDField(
+                default=core.utils.ids.uuid7,
+                editable=False,
+                primary_key=True,
+                serialize=False,
+            ),
+        ),
+    ]
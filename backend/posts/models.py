@@ -1,5 +1,6 @@
-from django.db import models
-import uuid
+from django.db import models, transaction
+from core.utils.ids import uuid7
+from collections import defaultdict
 from django.core.files.storage import default_storage
 from django.contrib.auth.models import User
 from django.conf import settings
@@ -13,7 +14,7 @@ class Post(models.Model):
         ('AUDIO', 'Audio'),
     )
 
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
     author = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     type = models.CharField(max_length=5, choices=POST_TYPES)
     title = models.CharField(max_length=200)
@@ -37,6 +38,8 @@ class Post(models.Model):
         related_name='liked_posts',
         blank=True
     )
+    # Denormalized len(likes), kept current by posts.signals.update_likes_count
+    likes_count = models.PositiveIntegerField(default=0, db_index=True)
     
     # Fields for improved feed algorithm
     tags = models.ManyToManyField('Tag', related_name='posts', blank=True)
@@ -56,7 +59,7 @@ class Post(models.Model):
             raise ValidationError('Image is required for audio posts')  
 
 class Comment(models.Model):
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='comments')
     author = models.ForeignKey('users.User', on_delete=models.CASCADE)
     content = models.TextField()
@@ -89,6 +92,14 @@ class PostInteraction(models.Model):
             models.Index(fields=['user', 'interaction_type']),
             models.Index(fields=['post', 'interaction_type']),
             models.Index(fields=['created_at']),
+            # Other users' interactions with a set of posts (interest graph)
+            models.Index(fields=['post', 'user']),
+            # Small index covering only likes
+            models.Index(
+                fields=['user', 'post'],
+                condition=Q(interaction_type='LIKE'),
+                name='likes_user_post_idx',
+            ),
         ]
 
 class TrendingScore(models.Model):
@@ -161,23 +172,23 @@ class UserContentPreference(models.Model):
         """Update preferences based on user activity"""
         user = self.user
         
-        # Calculate content type preferences based on views, interactions, etc.
-        post_interactions = PostInteraction.objects.filter(user=user)
-        post_views = PostView.objects.filter(user=user)
+        # Count interactions and views by post type, one grouped query each
+        interactions_by_type = dict(
+            PostInteraction.objects.filter(user=user)
+            .values('post__type').annotate(c=Count('id')).order_by()
+            .values_list('post__type', 'c')
+        )
+        views_by_type = dict(
+            PostView.objects.filter(user=user)
+            .values('post__type').annotate(c=Count('id')).order_by()
+            .values_list('post__type', 'c')
+        )
         
-        if post_interactions.exists() or post_views.exists():
-            # Count interactions by post type
-            type_interactions = post_interactions.filter(
-                post__type='NEWS'
-            ).count()
-            
-            audio_interactions = post_interactions.filter(
-                post__type='AUDIO'
-            ).count()
-            
-            # Count views by post type
-            news_views = post_views.filter(post__type='NEWS').count()
-            audio_views = post_views.filter(post__type='AUDIO').count()
+        if interactions_by_type or views_by_type:
+            type_interactions = interactions_by_type.get('NEWS', 0)
+            audio_interactions = interactions_by_type.get('AUDIO', 0)
+            news_views = views_by_type.get('NEWS', 0)
+            audio_views = views_by_type.get('AUDIO', 0)
             
             # Calculate preferences based on interaction and view ratios
             total_interactions = type_interactions + audio_interactions
@@ -190,11 +201,13 @@ class UserContentPreference(models.Model):
                 self.news_preference = int((news_views / total_views) * 100)
                 self.audio_preference = int((audio_views / total_views) * 100)
             
-            # Calculate tag preferences
-            tag_counts = {}
-            for interaction in post_interactions:
-                for tag in interaction.post.tags.all():
-                    tag_counts[tag.name] = tag_counts.get(tag.name, 0) + 1
+            # Calculate tag preferences: for each tag, how many of the user's
+            # interactions were on posts carrying it
+            tag_counts = dict(
+                Tag.objects.filter(posts__interactions__user=user)
+                .annotate(c=Count('posts__interactions'))
+                .values_list('name', 'c')
+            )
             
             # Normalize to 0-100 scale
             if tag_counts:
@@ -213,15 +226,9 @@ class UserInterestGraph(models.Model):
     """
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='interest_graph')
     
-    # Store interest graph as JSON
-    # Format: {
-    #   "user_id_1": weight_1,
-    #   "user_id_2": weight_2,
-    #   ...
-    # }
-    interest_graph = models.JSONField(default=dict)
+    # The weighted edges themselves are InterestEdge rows (from_user=user)
     
-    # Last updated
+    # Last full calculation
     last_updated = models.DateTimeField(auto_now=True)
     
     class Meta:
@@ -234,6 +241,8 @@ class UserInterestGraph(models.Model):
     def get_or_create_for_user(cls, user):
         """Get or create interest graph for user"""
         graph, created = cls.objects.get_or_create(user=user)
+        # get() doesn't cache the relation; reuse the instance we already have
+        graph.user = user
         
         # If new or hasn't been updated in a while, recalculate
         if created or (timezone.now() - graph.last_updated) > timedelta(days=1):
@@ -241,6 +250,42 @@ class UserInterestGraph(models.Model):
             
         return graph
     
+    @classmethod
+    def add_edge_weights(cls, user_id, deltas):
+        """
+        Add weight deltas ({other_user_id: delta}) to a user's edges without
+        recalculating the graph. Edges that drop to zero are removed.
+        
+        last_updated is left alone so it keeps recording the last full
+        calculation, which corrects any drift from incremental updates.
+        Returns (graph, created).
+        """
+        user_key = str(user_id)
+        deltas = {str(other_id): delta for other_id, delta in deltas.items() if str(other_id) != user_key}
+        with transaction.atomic():
+            # Locking the graph row serializes edge updates for this user
+            graph, created = cls.objects.select_for_update().get_or_create(user_id=user_id)
+            edges = {
+                str(edge.to_user_id): edge
+                for edge in InterestEdge.objects.filter(from_user_id=user_id, to_user_id__in=deltas)
+            }
+            changed, added, removed = [], [], []
+            for other_id, delta in deltas.items():
+                edge = edges.get(other_id)
+                weight = (edge.weight if edge else 0) + delta
+                if weight <= 0:
+                    if edge:
+                        removed.append(edge.pk)
+                elif edge:
+                    edge.weight = weight
+                    changed.append(edge)
+                else:
+                    added.append(InterestEdge(from_user_id=user_id, to_user_id=other_id, weight=weight))
+            InterestEdge.objects.bulk_update(changed, ['weight'])
+            InterestEdge.objects.bulk_create(added, ignore_conflicts=True)
+            InterestEdge.objects.filter(pk__in=removed).delete()
+        return graph, created
+    
     def calculate_interest_graph(self):
         """
         Calculate interest graph by analyzing:
@@ -250,26 +295,30 @@ class UserInterestGraph(models.Model):
         4. Second-degree connections
         """
         user = self.user
-        interest_graph = {}
+        user_model = type(user)
+        interest_graph = defaultdict(int)
         
         # 1. Direct connections
         # Following gets high weight (direct interest from user)
-        for followed_user in user.following.all():
-            interest_graph[str(followed_user.id)] = interest_graph.get(str(followed_user.id), 0) + 10
+        for uid in user.following.values_list('id', flat=True):
+            interest_graph[str(uid)] += 10
         
         # Followers get medium weight (interest from others)
-        for follower in user.followers.all():
-            interest_graph[str(follower.id)] = interest_graph.get(str(follower.id), 0) + 5
+        for uid in user.followers.values_list('id', flat=True):
+            interest_graph[str(uid)] += 5
         
         # 2. Common interactions
-        # Get posts liked by user
-        liked_posts = user.liked_posts.all()
+        # Other users who liked the same posts, with how many they share
+        co_likers = user_model.objects.filter(
+            liked_posts__in=user.liked_posts.all()
+        ).exclude(
+            id=user.id
+        ).values('id').annotate(
+            common_count=Count('id')
+        ).order_by().values_list('id', 'common_count')
         
-        # For each liked post, find other users who liked it
-        for post in liked_posts:
-            for liker in post.likes.all():
-                if liker.id != user.id:
-                    interest_graph[str(liker.id)] = interest_graph.get(str(liker.id), 0) + 2
+        for uid, common_count in co_likers:
+            interest_graph[str(uid)] += 2 * common_count
         
         # 3. Content similarity
         # Get post interactions (likes, saves)
@@ -288,8 +337,7 @@ class UserInterestGraph(models.Model):
         
         # Add to graph with weight based on common count
         for similar_user in similar_users:
-            user_id = str(similar_user['user'])
-            interest_graph[user_id] = interest_graph.get(user_id, 0) + similar_user['common_count']
+            interest_graph[str(similar_user['user'])] += similar_user['common_count']
         
         # 4. Second-degree connections (friends of friends)
         # For efficiency, limit to top connections
@@ -299,43 +347,66 @@ class UserInterestGraph(models.Model):
             reverse=True
         )[:20]
         
-        for user_id, _ in top_connections:
-            try:
-                connected_user = type(user).objects.get(id=user_id)
-                for followed_user in connected_user.following.all():
-                    if str(followed_user.id) != str(user.id):
-                        interest_graph[str(followed_user.id)] = interest_graph.get(str(followed_user.id), 0) + 1
-            except:
-                pass
+        # One query over the follow table for everyone the top connections follow
+        second_degree = user_model.following.through.objects.filter(
+            from_user_id__in=[user_id for user_id, _ in top_connections]
+        ).exclude(
+            to_user_id=user.id
+        ).values_list('to_user_id', flat=True)
+        
+        for uid in second_degree:
+            interest_graph[str(uid)] += 1
         
         # Remove any connection to self
-        if str(user.id) in interest_graph:
-            del interest_graph[str(user.id)]
+        interest_graph.pop(str(user.id), None)
         
-        # Save the updated graph
-        self.interest_graph = interest_graph
-        self.save()
+        # Replace the stored edges with the recalculated ones
+        with transaction.atomic():
+            InterestEdge.objects.filter(from_user=user).delete()
+            InterestEdge.objects.bulk_create([
+                InterestEdge(from_user=user, to_user_id=uid, weight=weight)
+                for uid, weight in interest_graph.items()
+                if weight > 0
+            ])
+            self.save()
         
-        return interest_graph
+        return dict(interest_graph)
+    
+    def top_user_ids(self, limit=50):
+        """IDs of the users this user is most interested in, heaviest first"""
+        return list(
+            InterestEdge.objects.filter(from_user_id=self.user_id)
+            .order_by('-weight')
+            .values_list('to_user_id', flat=True)[:limit]
+        )
         
     def get_suggested_users(self, limit=10):
         """Get suggested users based on interest graph"""
-        user = self.user
-        
-        # Get interest graph
-        graph = self.interest_graph
-        
-        # Filter out users already followed
-        following_ids = set(str(uid) for uid in user.following.values_list('id', flat=True))
-        
-        # Sort by weight
-        suggested_users = [
-            (user_id, weight) 
-            for user_id, weight in graph.items() 
-            if user_id not in following_ids
-        ]
-        
-        suggested_users.sort(key=lambda x: x[1], reverse=True)
+        # Heaviest edges to users not already followed, sorted by the index
+        # Followed ids come from a subquery on the follow table, so the user
+        # row itself never has to be loaded
+        from django.contrib.auth import get_user_model
+        follow_model = get_user_model().following.through
+        edges = InterestEdge.objects.filter(
+            from_user_id=self.user_id
+        ).exclude(
+            to_user_id__in=follow_model.objects.filter(
+                from_user_id=self.user_id
+            ).values('to_user_id')
+        ).order_by('-weight').values_list('to_user_id', 'weight')[:limit]
         
         # Return suggested user IDs and weights
-        return suggested_users[:limit]
+        return [(str(user_id), weight) for user_id, weight in edges]
+
+
+class InterestEdge(models.Model):
+    """A weighted edge of a user's interest graph (see UserInterestGraph)"""
+    from_user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='interest_edges')
+    to_user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    weight = models.FloatField(default=0)
+    
+    class Meta:
+        unique_together = ('from_user', 'to_user')
+        indexes = [
+            models.Index(fields=['from_user', '-weight']),
+        ]
@@ -31,7 +31,7 @@ class PostSerializer(serializers.ModelSerializer):
     is_liked = serializers.BooleanField(read_only=True, default=False)
     is_saved = serializers.BooleanField(read_only=True, default=False)
     comments_count = serializers.IntegerField(source='comments.count', read_only=True)
-    likes_count = serializers.IntegerField(source='likes.count', read_only=True)
+    likes_count = serializers.IntegerField(read_only=True)
     trending_data = TrendingScoreSerializer(source='trending_score', read_only=True)
     image_url = serializers.SerializerMethodField()
     audio_url = serializers.SerializerMethodField()
@@ -2,22 +2,60 @@ from django.db.models.signals import post_save, m2m_changed
 from django.dispatch import receiver
 from django.utils import timezone
 from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import timedelta
+from threading import local
 
 import logging
 logger = logging.getLogger(__name__)
 
+# Incremental follow/like updates queue a full rebuild once the last full
+# calculation of a graph is older than this
+INTEREST_GRAPH_REBUILD_AFTER = timedelta(days=1)
+
+# Per-thread switch for the handlers below, see signals_paused()
+_state = local()
+
+def signals_paused_now():
+    """Whether the current thread is inside signals_paused()"""
+    return getattr(_state, 'paused', False)
+
+@contextmanager
+def signals_paused():
+    """
+    Skip the preference and interest graph handlers for writes made in
+    this block, e.g. backfills and data loads, where they would cascade
+    into queries per row. The periodic tasks catch up afterwards.
+    
+    Only the current thread is affected, unlike disconnecting receivers,
+    so concurrent requests in the same process keep their handlers.
+    """
+    previous = signals_paused_now()
+    _state.paused = True
+    try:
+        yield
+    finally:
+        _state.paused = previous
+
 # Try/except blocks to handle cases where migrations haven't been run yet
 try:
-    from .models import Post, PostInteraction, UserContentPreference, UserInterestGraph, PostView
+    from .models import Post, PostInteraction, UserContentPreference, UserInterestGraph
+    from .tasks import rebuild_user_interest_graph
     from django.contrib.auth import get_user_model
     User = get_user_model()
     
     @receiver(post_save, sender=PostInteraction)
-    def update_user_preferences_on_interaction(sender, instance, created, **kwargs):
+    def update_user_preferences_on_interaction(sender, instance, created, raw=False, **kwargs):
         """
         When a user interacts with a post, update their content preferences
+        Fixture loads (raw) and signals_paused() blocks are skipped
         """
-        if created:
+        if created and not raw and not signals_paused_now():
             try:
                 # Get or create user preferences
                 user_prefs, _ = UserContentPreference.objects.get_or_create(user=instance.user)
@@ -29,74 +67,120 @@ try:
             except Exception as e:
                 logger.error(f"Error updating user preferences: {str(e)}")
     
-    @receiver(post_save, sender=PostView)
-    def update_user_preferences_on_view(sender, instance, created, **kwargs):
+    def apply_interest_graph_deltas(user_id, deltas):
         """
-        When a user views a post, update their content preferences
-        but with a lower frequency than for direct interactions
+        Apply weight deltas to a user's interest graph, and queue a full
+        rebuild if the graph is new or was last fully calculated too long ago
         """
-        if created:
-            try:
-                # Only update preferences occasionally for views (1 in 10 chance)
-                import random
-                if random.random() < 0.1:  # 10% chance to update
-                    # Get or create user preferences
-                    user_prefs, _ = UserContentPreference.objects.get_or_create(user=instance.user)
-                    
-                    # If the preference hasn't been updated in the last 3 days, update it now
-                    if (timezone.now() - user_prefs.last_updated).days >= 3:
-                        user_prefs.update_preferences()
-                        logger.debug(f"Updated content preferences for user {instance.user.id} based on view")
-            except Exception as e:
-                logger.error(f"Error updating user preferences on view: {str(e)}")
+        graph, created = UserInterestGraph.add_edge_weights(user_id, deltas)
+        stale = created or (timezone.now() - graph.last_updated) > INTEREST_GRAPH_REBUILD_AFTER
+        # The cache key keeps a burst of events from queueing the same rebuild
+        if stale and cache.add(f'interest_graph_rebuild:{user_id}', True, 60 * 60):
+            # robust: an unreachable broker is logged rather than failing
+            # the like/follow request after its write has committed
+            transaction.on_commit(lambda: rebuild_user_interest_graph.delay(str(user_id)), robust=True)
     
     @receiver(m2m_changed, sender=User.following.through)
     def update_interest_graph_on_follow(sender, instance, action, reverse, model, pk_set, **kwargs):
         """
-        When a user follows or unfollows another user, update their interest graph
+        When a user follows or unfollows another user, adjust the edge
+        between them in both users' interest graphs
         """
         try:
-            if action in ['post_add', 'post_remove']:
-                # Only proceed if the instance is a User (could be called from either side of the relationship)
-                if isinstance(instance, User):
-                    # Get or create interest graph
-                    graph, _ = UserInterestGraph.objects.get_or_create(user=instance)
-                    
-                    # Recalculate the graph
-                    graph.calculate_interest_graph()
-                    logger.debug(f"Updated interest graph for user {instance.id} after follow/unfollow")
+            if action in ['post_add', 'post_remove'] and not signals_paused_now():
+                sign = 1 if action == 'post_add' else -1
+                # instance is the follower, or the followed user when reverse
+                if reverse:
+                    follows = [(follower_id, instance.pk) for follower_id in pk_set]
+                else:
+                    follows = [(instance.pk, followed_id) for followed_id in pk_set]
+                
+                for follower_id, followed_id in follows:
+                    # Following gets high weight, being followed medium weight
+                    apply_interest_graph_deltas(follower_id, {followed_id: 10 * sign})
+                    apply_interest_graph_deltas(followed_id, {follower_id: 5 * sign})
+                logger.debug(f"Updated interest graphs for {len(follows)} follow changes")
         except Exception as e:
             logger.error(f"Error updating interest graph: {str(e)}")
     
+    def recount_likes(post_ids):
+        """
+        Set likes_count of the given posts from the likes table, in one UPDATE
+        Counting rather than adding the change keeps the counter right when
+        pk_set names likes that didn't exist, or concurrent unlikes overlap
+        """
+        likes = Post.likes.through.objects.filter(
+            post_id=OuterRef('pk')
+        ).order_by().values('post_id').annotate(c=Count('*')).values('c')
+        Post.objects.filter(pk__in=post_ids).update(likes_count=Coalesce(Subquery(likes), 0))
+    
+    @receiver(m2m_changed, sender=Post.likes.through)
+    def update_likes_count(sender, instance, action, reverse, model, pk_set, **kwargs):
+        """
+        Keep Post.likes_count in step with likes being added and removed
+        Runs even inside signals_paused(), since it is a single UPDATE
+        """
+        if not reverse:
+            # instance is the post
+            if action in ['post_add', 'post_remove', 'post_clear']:
+                recount_likes([instance.pk])
+        elif action in ['post_add', 'post_remove']:
+            # instance is the user; pk_set holds the posts
+            recount_likes(pk_set)
+        elif action == 'pre_clear':
+            # user.liked_posts.clear() reports no pk_set, so note which
+            # posts lose a like before they are gone
+            instance._cleared_liked_post_ids = list(
+                Post.likes.through.objects.filter(user_id=instance.pk).values_list('post_id', flat=True)
+            )
+        elif action == 'post_clear':
+            recount_likes(instance.__dict__.pop('_cleared_liked_post_ids', []))
+    
     @receiver(m2m_changed, sender=Post.likes.through)
     def update_interest_graph_on_like(sender, instance, action, reverse, model, pk_set, **kwargs):
         """
-        When a user likes a post, update their interest graph
+        When a user likes or unlikes a post, adjust the edges between them
+        and the other users who liked it, in both directions
         The interest graph depends on like data to determine user similarity
         """
         try:
-            if action == 'post_add':
+            if action in ['post_add', 'post_remove'] and not signals_paused_now():
+                sign = 1 if action == 'post_add' else -1
+                # instance is the post, or the user when reverse
                 if reverse:
-                    # The 'instance' is a User, and pk_set contains Post IDs
-                    user = instance
+                    likes = [(post_id, instance.pk) for post_id in pk_set]
                 else:
-                    # The 'instance' is a Post, and pk_set contains User IDs
-                    # We need to process each user who liked the post
-                    for user_id in pk_set:
-                        try:
-                            user = User.objects.get(id=user_id)
-                            
-                            # Get or create interest graph
-                            graph, _ = UserInterestGraph.objects.get_or_create(user=user)
-                            
-                            # Only update occasionally to save resources (1 in 5 likes)
-                            import random
-                            if random.random() < 0.2:  # 20% chance
-                                # Recalculate the graph
-                                graph.calculate_interest_graph()
-                                logger.debug(f"Updated interest graph for user {user.id} after like")
-                        except User.DoesNotExist:
+                    likes = [(instance.pk, user_id) for user_id in pk_set]
+                
+                changed_by_post = defaultdict(set)
+                for post_id, user_id in likes:
+                    changed_by_post[post_id].add(user_id)
+                
+                # After a remove the changed likers are gone from the table,
+                # but their edges to each other still have to come down
+                likers_by_post = defaultdict(set)
+                for post_id, user_id in Post.likes.through.objects.filter(
+                    post_id__in=changed_by_post
+                ).values_list('post_id', 'user_id'):
+                    likers_by_post[post_id].add(user_id)
+                
+                # Each post liked in common is worth 2 in both users' graphs,
+                # as in calculate_interest_graph; a pair of changed likers is
+                # visited from each side, so each visit covers one direction
+                deltas_by_user = defaultdict(lambda: defaultdict(int))
+                for post_id, liker_id in likes:
+                    changed = changed_by_post[post_id]
+                    for other_id in likers_by_post[post_id] | changed:
+                        if other_id == liker_id:
                             continue
+                        deltas_by_user[liker_id][other_id] += 2 * sign
+                        if other_id not in changed:
+                            deltas_by_user[other_id][liker_id] += 2 * sign
+                
+                # A fixed order keeps concurrent likes from locking graph
+                # rows in opposite orders
+                for user_id in sorted(deltas_by_user, key=str):
+                    apply_interest_graph_deltas(user_id, deltas_by_user[user_id])
         except Exception as e:
             logger.error(f"Error updating interest graph on like: {str(e)}")
             
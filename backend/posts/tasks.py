@@ -1,12 +1,78 @@
 from celery import shared_task
+from django.contrib.auth import get_user_model
 from django.utils import timezone
 from datetime import timedelta
-from django.db.models import Count, F, Q, Case, When, Value, FloatField, ExpressionWrapper
-from django.db.models.functions import Cast
+from django.db.models import Count, F, Q, Case, When, Value, FloatField, ExpressionWrapper, OuterRef, Subquery
+from django.db.models.functions import Cast, Coalesce, Greatest
+from django_redis import get_redis_connection
+from itertools import islice
 import logging
 import random
 
+from core.utils.encoding import json_dumps, json_loads
+
 logger = logging.getLogger(__name__)
+User = get_user_model()
+
+# Redis list of post views waiting for flush_post_views
+PENDING_VIEWS_KEY = 'posts:pending_views'
+VIEW_FLUSH_BATCH_SIZE = 1000
+
+# TrendingScore columns written by update_trending_scores
+TRENDING_SCORE_FIELDS = ['score', 'view_count', 'like_count', 'comment_count', 'share_count', 'last_calculated']
+
+# Trending counts (day/week/month decay) and their weights, with the
+# likes/comments/views multipliers (1.0/1.5/0.8) folded in
+TRENDING_COUNT_WEIGHTS = {
+    'day_likes': 10 * 1.0, 'week_likes': 5 * 1.0, 'month_likes': 1 * 1.0,
+    'day_comments': 15 * 1.5, 'week_comments': 7 * 1.5, 'month_comments': 2 * 1.5,
+    'day_views': 1 * 0.8, 'week_views': 0.5 * 0.8, 'month_views': 0.1 * 0.8,
+}
+
+# Newer posts get a boost: age in days up to each limit, and the factor for it
+TRENDING_AGE_LIMITS = (1, 3, 7, 14, 30)
+TRENDING_AGE_FACTORS = (1.5, 1.2, 1.0, 0.8, 0.6)
+TRENDING_AGE_FACTOR_DEFAULT = 0.4
+
+def trending_score_expression(now):
+    """
+    The trending score of a post annotated by update_trending_scores, as a
+    database expression so the score is computed by the same query as the counts
+    """
+    decayed = sum(
+        (F(field) * Value(weight) for field, weight in TRENDING_COUNT_WEIGHTS.items()),
+        Value(0.0)
+    )
+    
+    # Engagement ratio (interactions per view), avoiding division by zero
+    engagement_ratio = (
+        Cast(F('likes_count') + F('total_comments'), FloatField()) /
+        Greatest(F('total_views'), 1)
+    )
+    
+    # Age in whole days plus one is <= limit exactly when the post is
+    # less than limit days old
+    age_factor = Case(
+        *[
+            When(created_at__gt=now - timedelta(days=limit), then=Value(factor))
+            for limit, factor in zip(TRENDING_AGE_LIMITS, TRENDING_AGE_FACTORS)
+        ],
+        default=Value(TRENDING_AGE_FACTOR_DEFAULT),
+        output_field=FloatField()
+    )
+    
+    return ExpressionWrapper(decayed * engagement_ratio * age_factor, output_field=FloatField())
+
+def post_count_subquery(model, since=None, **filters):
+    """
+    Number of model rows pointing at the outer post, as an annotation
+    Each relation gets its own subquery so joins don't multiply rows
+    """
+    rows = model.objects.filter(post=OuterRef('pk'), **filters)
+    if since is not None:
+        rows = rows.filter(created_at__gte=since)
+    counts = rows.order_by().values('post').annotate(c=Count('*')).values('c')
+    return Coalesce(Subquery(counts), 0)
 
 @shared_task
 def update_trending_scores(batch_size=500, max_posts=10000):
@@ -20,7 +86,7 @@ def update_trending_scores(batch_size=500, max_posts=10000):
     - Content type weights
     """
     try:
-        from .models import Post, TrendingScore
+        from .models import Comment, Post, PostInteraction, PostView, TrendingScore
         
         # Time windows for scoring
         now = timezone.now()
@@ -28,98 +94,61 @@ def update_trending_scores(batch_size=500, max_posts=10000):
         last_week = now - timedelta(days=7)
         last_month = now - timedelta(days=30)
         
-        # Get posts ordered by recent interactions first
+        # Every count the score needs, fetched with the posts in one query.
+        # Post.likes has no timestamp, so likes over time come from the
+        # LIKE interactions
         posts = Post.objects.annotate(
-            recent_likes=Count(
-                'likes', 
-                filter=Q(likes__created_at__gte=last_week)
-            ),
-            recent_comments=Count(
-                'comments', 
-                filter=Q(comments__created_at__gte=last_week)
-            ),
-            recent_views=Count(
-                'views', 
-                filter=Q(views__created_at__gte=last_week)
-            )
+            day_likes=post_count_subquery(PostInteraction, last_day, interaction_type='LIKE'),
+            week_likes=post_count_subquery(PostInteraction, last_week, interaction_type='LIKE'),
+            month_likes=post_count_subquery(PostInteraction, last_month, interaction_type='LIKE'),
+            day_comments=post_count_subquery(Comment, last_day),
+            week_comments=post_count_subquery(Comment, last_week),
+            month_comments=post_count_subquery(Comment, last_month),
+            day_views=post_count_subquery(PostView, last_day),
+            week_views=post_count_subquery(PostView, last_week),
+            month_views=post_count_subquery(PostView, last_month),
+            total_views=post_count_subquery(PostView),
+            total_comments=post_count_subquery(Comment),
+            share_count=post_count_subquery(PostInteraction, interaction_type='SHARE'),
+        ).annotate(
+            final_score=trending_score_expression(now)
         ).order_by(
-            '-recent_likes', 
-            '-recent_comments',
-            '-recent_views',
+            # Posts ordered by recent interactions first
+            '-week_likes', 
+            '-week_comments',
+            '-week_views',
             '-created_at'
+        ).values_list(
+            'id', 'final_score', 'total_views', 'likes_count', 'total_comments', 'share_count'
         )[:max_posts]
         
         # Process in batches
         total_processed = 0
         updated_count = 0
         
-        for i in range(0, min(posts.count(), max_posts), batch_size):
-            batch = posts[i:i+batch_size]
-            
-            for post in batch:
-                # Get interaction counts for different time periods
-                day_likes = post.likes.filter(created_at__gte=last_day).count()
-                week_likes = post.likes.filter(created_at__gte=last_week).count()
-                month_likes = post.likes.filter(created_at__gte=last_month).count()
-                
-                day_comments = post.comments.filter(created_at__gte=last_day).count()
-                week_comments = post.comments.filter(created_at__gte=last_week).count()
-                month_comments = post.comments.filter(created_at__gte=last_month).count()
-                
-                day_views = post.views.filter(created_at__gte=last_day).count()
-                week_views = post.views.filter(created_at__gte=last_week).count()
-                month_views = post.views.filter(created_at__gte=last_month).count()
-                
-                # Calculate base interaction scores with time decay
-                likes_score = (day_likes * 10) + (week_likes * 5) + (month_likes * 1)
-                comments_score = (day_comments * 15) + (week_comments * 7) + (month_comments * 2)
-                views_score = (day_views * 1) + (week_views * 0.5) + (month_views * 0.1)
-                
-                # Engagement ratio (interactions per view)
-                total_views = post.views.count() or 1  # Avoid division by zero
-                engagement_ratio = (post.likes.count() + post.comments.count()) / total_views
-                
-                # Account for post age (newer posts get a boost)
-                age_factor = 1.0
-                post_age_days = (now - post.created_at).days + 1  # Avoid division by zero
-                
-                if post_age_days <= 1:
-                    age_factor = 1.5
-                elif post_age_days <= 3:
-                    age_factor = 1.2
-                elif post_age_days <= 7:
-                    age_factor = 1.0
-                elif post_age_days <= 14:
-                    age_factor = 0.8
-                elif post_age_days <= 30:
-                    age_factor = 0.6
-                else:
-                    age_factor = 0.4
-                
-                # Calculate final score
-                final_score = (
-                    (likes_score * 1.0) +
-                    (comments_score * 1.5) +
-                    (views_score * 0.8)
-                ) * engagement_ratio * age_factor
-                
-                # Update or create trending score
-                trending_score, created = TrendingScore.objects.update_or_create(
-                    post=post,
-                    defaults={
-                        'score': final_score,
-                        'view_count': post.views.count(),
-                        'like_count': post.likes.count(),
-                        'comment_count': post.comments.count(),
-                        'share_count': post.interactions.filter(interaction_type='SHARE').count(),
-                        'last_calculated': now
-                    }
-                )
-                
-                if created or trending_score.score != final_score:
-                    updated_count += 1
-                
-                total_processed += 1
+        # Run the annotated query once and take its rows batch_size at a time
+        rows = posts.iterator(chunk_size=batch_size)
+        for batch in iter(lambda: list(islice(rows, batch_size)), []):
+            # Scores arrive computed; one upsert writes the whole batch
+            TrendingScore.objects.bulk_create(
+                [
+                    TrendingScore(
+                        post_id=post_id,
+                        score=final_score,
+                        view_count=total_views,
+                        like_count=likes_count,
+                        comment_count=total_comments,
+                        share_count=share_count,
+                        last_calculated=now
+                    )
+                    for post_id, final_score, total_views, likes_count, total_comments, share_count in batch
+                ],
+                update_conflicts=True,
+                unique_fields=['post'],
+                update_fields=TRENDING_SCORE_FIELDS
+            )
+            total_processed += len(batch)
+            updated_count += len(batch)
                 
         logger.info(f"Processed {total_processed} posts, updated {updated_count} trending scores")
         return {
@@ -142,11 +171,8 @@ def update_user_preferences(batch_size=100, max_users=10000):
     This helps personalize the feed algorithm
     """
     try:
-        from django.contrib.auth import get_user_model
         from .models import UserContentPreference
         
-        User = get_user_model()
-        
         # Get users with recent activity
         active_users = User.objects.filter(
             Q(liked_posts__created_at__gte=timezone.now() - timedelta(days=30)) |
@@ -191,18 +217,15 @@ def update_user_interest_graphs(batch_size=50, max_users=1000):
     and with smaller batches
     """
     try:
-        from django.contrib.auth import get_user_model
         from .models import UserInterestGraph
         
-        User = get_user_model()
-        
         # Get users with social activity (following/followers)
         social_users = User.objects.annotate(
             follower_count=Count('followers'),
             following_count=Count('following')
         ).filter(
             Q(follower_count__gt=0) | Q(following_count__gt=0)
-        ).order_by('-follower_count', '-following_count')[:max_users]
+        ).order_by('-follower_count', '-following_count').select_related('interest_graph')[:max_users]
         
         total_processed = 0
         updated_count = 0
@@ -212,8 +235,11 @@ def update_user_interest_graphs(batch_size=50, max_users=1000):
             batch = social_users[i:i+batch_size]
             
             for user in batch:
-                # Get or create graph
-                graph, created = UserInterestGraph.objects.get_or_create(user=user)
+                # Get or create graph; existing ones come with the batch
+                try:
+                    graph, created = user.interest_graph, False
+                except UserInterestGraph.DoesNotExist:
+                    graph, created = UserInterestGraph.objects.get_or_create(user=user)
                 
                 # Only update if needed (created or outdated)
                 if created or (timezone.now() - graph.last_updated) > timedelta(days=1):
@@ -238,41 +264,138 @@ def update_user_interest_graphs(batch_size=50, max_users=1000):
         }
 
 @shared_task
-def record_post_view(user_id, post_id, view_duration=0):
+def rebuild_user_interest_graph(user_id):
     """
-    Record a post view with an optional view duration
-    This is handled as a background task to avoid slowing down the API
+    Fully recalculate one user's interest graph
+    Queued by the follow/like signals when incremental updates find the graph stale
     """
     try:
-        from django.contrib.auth import get_user_model
-        from .models import Post, PostView
+        from .models import UserInterestGraph
+        
+        graph, _ = UserInterestGraph.objects.get_or_create(user_id=user_id)
+        graph.calculate_interest_graph()
+        return True
         
-        User = get_user_model()
+    except Exception as e:
+        logger.error(f"Error rebuilding interest graph for user {user_id}: {str(e)}")
+        return False
+
+def buffer_post_view(user_id, post_id, view_duration=0):
+    """
+    Queue a post view in Redis; flush_post_views writes the queued views
+    to the database in bulk
+    """
+    get_redis_connection('default').rpush(PENDING_VIEWS_KEY, json_dumps({
+        'user_id': str(user_id),
+        'post_id': str(post_id),
+        # view_duration is a PositiveIntegerField; one negative value
+        # would fail the whole bulk insert
+        'view_duration': max(0, int(view_duration)),
+    }))
+
+@shared_task
+def record_post_view(user_id, post_id, view_duration=0):
+    """
+    Record a post view with an optional view duration
+    Views are now buffered by the API directly; this task only forwards
+    messages queued before that change
+    """
+    buffer_post_view(user_id, post_id, view_duration)
+    return True
+
+@shared_task
+def flush_post_views(batch_size=VIEW_FLUSH_BATCH_SIZE, max_batches=20):
+    """
+    Write buffered post views to the database, one bulk insert per batch
+    instead of a get_or_create (and post_save signal) per view
+    """
+    from .models import Post, PostView
+    
+    redis = get_redis_connection('default')
+    flushed = 0
+    
+    for _ in range(max_batches):
+        # Take a batch off the list atomically
+        with redis.pipeline() as pipe:
+            pipe.lrange(PENDING_VIEWS_KEY, 0, batch_size - 1)
+            pipe.ltrim(PENDING_VIEWS_KEY, batch_size, -1)
+            raw_views, _ = pipe.execute()
+        if not raw_views:
+            break
         
-        # Get user and post
         try:
-            user = User.objects.get(id=user_id)
-            post = Post.objects.get(id=post_id)
-        except (User.DoesNotExist, Post.DoesNotExist) as e:
-            logger.warning(f"Could not record view: {str(e)}")
-            return False
+            # One row per (post, user); a later non-zero duration wins
+            durations = {}
+            for raw in raw_views:
+                view = json_loads(raw)
+                key = (view['post_id'], view['user_id'])
+                duration = max(0, int(view['view_duration']))
+                if duration > 0 or key not in durations:
+                    durations[key] = duration
             
-        # Create or update view
-        view, created = PostView.objects.get_or_create(
-            user=user, 
-            post=post,
-            defaults={
-                'view_duration': view_duration
-            }
-        )
-        
-        # If view already existed, update duration
-        if not created and view_duration > 0:
-            view.view_duration = view_duration
-            view.save(update_fields=['view_duration'])
+            # Skip views of posts or by users deleted since
+            post_ids = {str(pk) for pk in Post.objects.filter(
+                id__in={post_id for post_id, _ in durations}
+            ).values_list('id', flat=True)}
+            user_ids = {str(pk) for pk in User.objects.filter(
+                id__in={user_id for _, user_id in durations}
+            ).values_list('id', flat=True)}
             
-        return True
+            new_views = []
+            timed_views = []
+            for (post_id, user_id), duration in durations.items():
+                if post_id in post_ids and user_id in user_ids:
+                    view = PostView(post_id=post_id, user_id=user_id, view_duration=duration)
+                    (timed_views if duration > 0 else new_views).append(view)
             
+            # ON CONFLICT DO NOTHING for plain views, and for views with a
+            # duration ON CONFLICT DO UPDATE of view_duration, as the
+            # one-by-one path did
+            PostView.objects.bulk_create(new_views, ignore_conflicts=True)
+            PostView.objects.bulk_create(
+                timed_views,
+                update_conflicts=True,
+                unique_fields=['post', 'user'],
+                update_fields=['view_duration'],
+            )
+        except Exception as e:
+            # The batch is already off the list; put it back for the next run
+            logger.error(f"Error flushing {len(raw_views)} post views: {str(e)}")
+            redis.rpush(PENDING_VIEWS_KEY, *raw_views)
+            break
+        
+        flushed += len(raw_views)
+        if len(raw_views) < batch_size:
+            break
+    
+    return flushed
+
+@shared_task
+def process_post_image(post_id, raw_path):
+    """
+    Resize and re-encode a post image that the upload view stored raw,
+    then point the post at the processed file
+    This is handled as a background task to avoid slowing down the API
+    """
+    from django.core.cache import cache
+    from django.core.files.storage import default_storage
+    from core.utils.file_handlers import save_processed_image
+    from .models import Post
+
+    try:
+        with default_storage.open(raw_path, 'rb') as raw:
+            image_path = save_processed_image(raw, 'posts/images')
     except Exception as e:
-        logger.error(f"Error recording post view: {str(e)}")
-        return False 
\ No newline at end of file
+        # The post keeps serving the unprocessed upload
+        logger.error(f"Error processing image for post {post_id}: {str(e)}")
+        return False
+
+    # Only swap if the post still uses the raw upload; it may have been
+    # deleted or given a new image in the meantime
+    if Post.objects.filter(pk=post_id, image=raw_path).update(image=image_path):
+        default_storage.delete(raw_path)
+        cache.delete(f'post:{post_id}')
+        return True
+
+    default_storage.delete(image_path)
+    return False
@@ -1,3 +1,232 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError
 from django.test import TestCase
+from django.utils import timezone
+
+from core.utils.encoding import json_dumps
+from .models import Comment, InterestEdge, Post, PostInteraction, PostView, TrendingScore
+from .tasks import PENDING_VIEWS_KEY, buffer_post_view, flush_post_views, update_trending_scores
+
+User = get_user_model()
+
+
+class UpdateTrendingScoresTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(email='author@example.com', username='author')
+        self.first = User.objects.create_user(email='first@example.com', username='first')
+        self.second = User.objects.create_user(email='second@example.com', username='second')
+        self.post = Post.objects.create(author=self.author, type='NEWS', title='Trending', description='Body')
+        self.quiet_post = Post.objects.create(author=self.author, type='NEWS', title='Quiet', description='Body')
+
+    def test_writes_scores_from_bucketed_counts(self):
+        self.post.likes.add(self.first, self.second)
+        PostInteraction.objects.create(user=self.first, post=self.post, interaction_type='LIKE')
+        old_like = PostInteraction.objects.create(user=self.second, post=self.post, interaction_type='LIKE')
+        PostInteraction.objects.filter(pk=old_like.pk).update(created_at=timezone.now() - timedelta(days=10))
+        PostInteraction.objects.create(user=self.first, post=self.post, interaction_type='SHARE')
+        Comment.objects.create(post=self.post, author=self.first, content='Nice')
+        PostView.objects.create(post=self.post, user=self.first)
+        PostView.objects.create(post=self.post, user=self.second)
+
+        result = update_trending_scores()
+
+        self.assertEqual(result, {'processed': 2, 'updated': 2})
+        score = TrendingScore.objects.get(post=self.post)
+        self.assertEqual(
+            (score.view_count, score.like_count, score.comment_count, score.share_count),
+            (2, 2, 1, 1)
+        )
+        # Likes 1/1/2, comments 1/1/1, views 2/2/2 over day/week/month;
+        # engagement (2 likes + 1 comment) / 2 views; under a day old
+        likes_score = 1 * 10 + 1 * 5 + 2 * 1
+        comments_score = 1 * 15 + 1 * 7 + 1 * 2
+        views_score = 2 * 1 + 2 * 0.5 + 2 * 0.1
+        expected = (likes_score * 1.0 + comments_score * 1.5 + views_score * 0.8) * (3 / 2) * 1.5
+        self.assertAlmostEqual(score.score, expected)
+        self.assertEqual(TrendingScore.objects.get(post=self.quiet_post).score, 0)
+
+    def test_updates_existing_scores(self):
+        update_trending_scores()
+        Comment.objects.create(post=self.quiet_post, author=self.first, content='First')
+
+        update_trending_scores()
+
+        score = TrendingScore.objects.get(post=self.quiet_post)
+        self.assertEqual(score.comment_count, 1)
+        self.assertEqual(TrendingScore.objects.count(), 2)
+
+
+class LikeInterestGraphTests(TestCase):
+    """Like deltas keep both users' edges equal to a full rebuild's co-like weight"""
+
+    def setUp(self):
+        self.author = User.objects.create_user(email='author@example.com', username='author')
+        self.first = User.objects.create_user(email='first@example.com', username='first')
+        self.second = User.objects.create_user(email='second@example.com', username='second')
+        self.third = User.objects.create_user(email='third@example.com', username='third')
+        self.post = Post.objects.create(author=self.author, type='NEWS', title='Liked', description='Body')
+
+    def edges(self):
+        return {
+            (edge.from_user_id, edge.to_user_id): edge.weight
+            for edge in InterestEdge.objects.all()
+        }
+
+    def test_like_weights_both_directions(self):
+        self.post.likes.add(self.first)
+        self.second.liked_posts.add(self.post)
+
+        self.assertEqual(self.edges(), {
+            (self.first.id, self.second.id): 2,
+            (self.second.id, self.first.id): 2,
+        })
+
+    def test_likes_added_together_are_counted_once(self):
+        self.post.likes.add(self.first)
+        self.post.likes.add(self.second, self.third)
+
+        edges = self.edges()
+        self.assertEqual(len(edges), 6)
+        self.assertEqual(set(edges.values()), {2})
+
+    def test_likes_removed_together_drop_their_shared_edges(self):
+        self.post.likes.add(self.first, self.second, self.third)
+        self.post.likes.remove(self.second, self.third)
+
+        self.assertEqual(self.edges(), {})
+
+
+class LikesCountTests(TestCase):
+    """likes_count follows the likes table through every m2m change"""
+
+    def setUp(self):
+        self.author = User.objects.create_user(email='author@example.com', username='author')
+        self.first = User.objects.create_user(email='first@example.com', username='first')
+        self.second = User.objects.create_user(email='second@example.com', username='second')
+        self.post = Post.objects.create(author=self.author, type='NEWS', title='Liked', description='Body')
+        self.other_post = Post.objects.create(author=self.author, type='NEWS', title='Other', description='Body')
+
+    def likes_counts(self):
+        return dict(Post.objects.values_list('title', 'likes_count'))
+
+    def test_add_and_remove_from_the_post(self):
+        self.post.likes.add(self.first, self.second)
+        self.assertEqual(self.likes_counts(), {'Liked': 2, 'Other': 0})
+
+        # Removing a user who never liked the post changes nothing
+        self.post.likes.remove(self.second, self.author)
+        self.assertEqual(self.likes_counts(), {'Liked': 1, 'Other': 0})
+
+    def test_add_and_remove_from_the_user(self):
+        self.first.liked_posts.add(self.post, self.other_post)
+        self.second.liked_posts.add(self.post)
+        self.assertEqual(self.likes_counts(), {'Liked': 2, 'Other': 1})
+
+        self.first.liked_posts.remove(self.post)
+        self.assertEqual(self.likes_counts(), {'Liked': 1, 'Other': 1})
+
+    def test_clear_from_the_post(self):
+        self.post.likes.add(self.first, self.second)
+        self.other_post.likes.add(self.first)
+
+        self.post.likes.clear()
+
+        self.assertEqual(self.likes_counts(), {'Liked': 0, 'Other': 1})
+
+    def test_clear_from_the_user(self):
+        self.first.liked_posts.add(self.post, self.other_post)
+        self.second.liked_posts.add(self.post)
+
+        self.first.liked_posts.clear()
+
+        self.assertEqual(self.likes_counts(), {'Liked': 1, 'Other': 0})
+
+
+class FakeRedisList:
+    """The list commands flush_post_views uses, on one in-memory list"""
+
+    def __init__(self):
+        self.items = []
+        self.commands = []
+
+    def rpush(self, key, *values):
+        self.items.extend(value.encode() if isinstance(value, str) else value for value in values)
+        return len(self.items)
+
+    def lrange(self, key, start, end):
+        self.commands.append(lambda: self.items[start:end + 1])
+        return self
+
+    def ltrim(self, key, start, end):
+        def trim():
+            del self.items[:start]
+        self.commands.append(trim)
+        return self
+
+    def execute(self):
+        results = [command() for command in self.commands]
+        self.commands = []
+        return results
+
+    def pipeline(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+class FlushPostViewsTests(TestCase):
+    def setUp(self):
+        self.redis = FakeRedisList()
+        patch = mock.patch('posts.tasks.get_redis_connection', return_value=self.redis)
+        patch.start()
+        self.addCleanup(patch.stop)
+        self.author = User.objects.create_user(email='author@example.com', username='author')
+        self.viewer = User.objects.create_user(email='viewer@example.com', username='viewer')
+        self.post = Post.objects.create(author=self.author, type='NEWS', title='Viewed', description='Body')
+
+    def test_flush_writes_one_view_per_post_and_user(self):
+        buffer_post_view(self.viewer.id, self.post.id, 5)
+        buffer_post_view(self.viewer.id, self.post.id)
+        buffer_post_view(self.author.id, self.post.id)
+        deleted = Post.objects.create(author=self.author, type='NEWS', title='Gone', description='Body')
+        buffer_post_view(self.viewer.id, deleted.id)
+        deleted.delete()
+
+        self.assertEqual(flush_post_views(batch_size=2), 4)
+
+        self.assertEqual(self.redis.items, [])
+        self.assertEqual(
+            dict(PostView.objects.values_list('user_id', 'view_duration')),
+            {self.viewer.id: 5, self.author.id: 0}
+        )
+
+    def test_negative_duration_is_clamped(self):
+        self.redis.rpush(PENDING_VIEWS_KEY, json_dumps({
+            'user_id': str(self.viewer.id), 'post_id': str(self.post.id), 'view_duration': -3,
+        }))
+
+        flush_post_views()
+
+        self.assertEqual(PostView.objects.get().view_duration, 0)
+
+    def test_failed_batch_is_requeued(self):
+        buffer_post_view(self.viewer.id, self.post.id, 5)
+        buffer_post_view(self.author.id, self.post.id)
+        queued = list(self.redis.items)
+
+        with mock.patch.object(PostView.objects, 'bulk_create', side_effect=DatabaseError('down')):
+            self.assertEqual(flush_post_views(), 0)
+
+        self.assertEqual(self.redis.items, queued)
+        self.assertFalse(PostView.objects.exists())
 
-# Create your tests here.
+        # The next run writes the requeued views
+        self.assertEqual(flush_post_views(), 2)
+        self.assertEqual(PostView.objects.count(), 2)
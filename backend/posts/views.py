@@ -17,14 +17,15 @@ from drf_yasg import openapi
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 import json
 from rest_framework.exceptions import PermissionDenied
-from django.db import models
+from django.db import models, transaction
 
 from .models import Post, Comment, PostInteraction, TrendingScore
 from .serializers import PostSerializer, CommentSerializer, PostInteractionSerializer
+from .tasks import process_post_image
 from users.serializers import UserSerializer
 # from chat.models import ChatRoom, Message
 from core.decorators import handle_exceptions, cache_response
-from core.utils import handle_uploaded_file
+from core.utils import handle_uploaded_file, store_raw
 from core.views import BaseViewSet
 from core.db.decorators import use_primary_database, UsePrimaryDatabaseMixin
 
@@ -51,7 +52,6 @@ class PostViewSet(UsePrimaryDatabaseMixin, BaseViewSet):
         queryset = Post.objects.select_related('author', 'trending_score')\
             .prefetch_related('likes', 'comments')\
             .annotate(
-                likes_count=Count('likes', distinct=True),
                 comments_count=Count('comments', distinct=True)
             ).order_by('-created_at')  # Add default ordering
         
@@ -124,11 +124,8 @@ class PostViewSet(UsePrimaryDatabaseMixin, BaseViewSet):
                 try:
                     if not image.content_type.startswith('image/'):
                         raise ValidationError('Invalid image file type')
-                    image_path = handle_uploaded_file(
-                        image, 
-                        directory='posts/images',
-                        is_image=True
-                    )
+                    # Stored as uploaded; resized by process_post_image
+                    image_path = store_raw(image, directory='posts/images')
                 except Exception as e:
                     raise ValidationError(f'Error processing image: {str(e)}')
 
@@ -159,6 +156,12 @@ class PostViewSet(UsePrimaryDatabaseMixin, BaseViewSet):
             # Create trending score
             TrendingScore.objects.create(post=post)
             
+            # Resize and re-encode the image in a worker once the post is saved
+            if image_path:
+                transaction.on_commit(
+                    lambda: process_post_image.delay(str(post.id), image_path)
+                )
+            
             return post
 
         except Exception as e:
@@ -180,8 +183,11 @@ class PostViewSet(UsePrimaryDatabaseMixin, BaseViewSet):
         if image:
             if instance.image:
                 default_storage.delete(instance.image.name)
-            image_path = handle_uploaded_file(image, 'posts/images')
+            image_path = store_raw(image, 'posts/images')
             serializer.save(image=image_path)
+            transaction.on_commit(
+                lambda: process_post_image.delay(str(instance.id), image_path)
+            )
 
         # Handle audio update
         if audio_file:
@@ -465,14 +471,9 @@ class PostViewSet(UsePrimaryDatabaseMixin, BaseViewSet):
                 
             # Base posts from users in the interest graph
             related_user_ids = []
-            if interest_graph and interest_graph.interest_graph:
-                # Sort by weight and take top 50
-                sorted_interests = sorted(
-                    interest_graph.interest_graph.items(), 
-                    key=lambda x: x[1], 
-                    reverse=True
-                )[:50]
-                related_user_ids = [uid for uid, _ in sorted_interests]
+            if interest_graph:
+                # Top 50 by weight, sorted by the database
+                related_user_ids = interest_graph.top_user_ids(50)
             
             # If we have related users, prioritize their content
             if related_user_ids:
@@ -691,18 +692,18 @@ class PostViewSet(UsePrimaryDatabaseMixin, BaseViewSet):
             # Get duration if provided
             view_duration = request.data.get('view_duration', 0)
             try:
-                view_duration = int(view_duration)
+                view_duration = max(0, int(view_duration))
             except (ValueError, TypeError):
                 view_duration = 0
                 
-            # Use task to record view asynchronously (reduces API response time)
-            from .tasks import record_post_view
+            # Buffer the view; flush_post_views saves views in bulk
+            from .tasks import buffer_post_view
             
             if request.user.is_authenticated:
                 # For authenticated users, we'll use their ID
-                record_post_view.delay(
-                    user_id=str(request.user.id), 
-                    post_id=str(post.id),
+                buffer_post_view(
+                    user_id=request.user.id,
+                    post_id=post.id,
                     view_duration=view_duration
                 )
                 
@@ -897,7 +898,7 @@ class PostViewSet(UsePrimaryDatabaseMixin, BaseViewSet):
             trending_score = TrendingScore.objects.create(post=post)
 
         # Update counts
-        trending_score.like_count = post.likes.count()
+        trending_score.like_count = post.likes_count
         trending_score.comment_count = post.comments.count()
         trending_score.share_count = PostInteraction.objects.filter(
             post=post,
@@ -1088,7 +1089,7 @@ class PostViewSet(UsePrimaryDatabaseMixin, BaseViewSet):
                     
                     # Engagement ratio (interactions per view)
                     total_views = post.views.count() or 1  # Avoid division by zero
-                    engagement_ratio = (post.likes.count() + post.comments.count()) / total_views
+                    engagement_ratio = (post.likes_count + post.comments.count()) / total_views
                     
                     # Account for post age (newer posts get a boost)
                     age_factor = 1.0
@@ -1120,7 +1121,7 @@ class PostViewSet(UsePrimaryDatabaseMixin, BaseViewSet):
                         defaults={
                             'score': final_score,
                             'view_count': post.views.count(),
-                            'like_count': post.likes.count(),
+                            'like_count': post.likes_count,
                             'comment_count': post.comments.count(),
                             'share_count': post.interactions.filter(interaction_type='SHARE').count(),
                             'last_calculated': now
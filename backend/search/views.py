@@ -113,6 +113,14 @@ def get_string_similarity(str1, str2):
     
     return lev_score
 
+def _ordered_by_ids(model, ids):
+    """Return a queryset for ``ids`` that preserves their order."""
+    if not ids:
+        return model.objects.none()
+    return model.objects.filter(id__in=ids).order_by(
+        Case(*[When(id=pk, then=Value(pos)) for pos, pk in enumerate(ids)])
+    )
+
 # Perform a simple search when advanced search fails
 def simple_search(query, model, fields, limit=20):
     """
@@ -121,6 +129,7 @@ def simple_search(query, model, fields, limit=20):
     - Handles simple spelling mistakes
     - No caching, always fresh results
     - Uses faster queries with timeouts to prevent hanging
+    - Matching runs on ids only, with LIMIT pushed into every query
     """
     logger.info(f"Using simple search for '{query}' on {model.__name__}")
     query = query.lower().strip()
@@ -138,124 +147,74 @@ def simple_search(query, model, fields, limit=20):
     
     if model == User:
         # For users, search in username, first_name, last_name, email, bio
-        queryset = model.objects.all()
-        
-        try:
-            # First grab exact matches - fast lookup
-            exact_matches = queryset.filter(
-                Q(username__iexact=query) |
-                Q(first_name__iexact=query) |
-                Q(last_name__iexact=query) |
-                Q(email__iexact=query)
-            )[:limit]
-            
-            # If we have enough exact matches, return them
-            if len(exact_matches) >= limit:
-                return exact_matches
-            
-            # Then partial matches
-            remaining = limit - len(exact_matches)
-            partial_matches = queryset.filter(
-                Q(username__icontains=query) |
-                Q(first_name__icontains=query) |
-                Q(last_name__icontains=query) |
-                Q(email__icontains=query) |
-                Q(bio__icontains=query)
-            ).exclude(id__in=[user.id for user in exact_matches])[:remaining]
-            
-            # Combine results
-            all_matches = list(exact_matches) + list(partial_matches)
-            
-            # If we don't have enough results, do a more relaxed search with string similarity
-            if len(all_matches) < limit:
-                # Get a limited number of potential matches to avoid memory issues
-                remaining_needed = limit - len(all_matches)
-                potential_matches = queryset.exclude(
-                    id__in=[user.id for user in all_matches]
-                ).order_by('-date_joined')[:300]  # Limit to 300 for performance
-                
-                # Score based on string similarity
-                similar_matches = []
-                for user in potential_matches:
-                    max_score = 0
-                    for field in fields:
-                        field_value = getattr(user, field, "")
-                        if field_value:
-                            similarity = get_string_similarity(query, str(field_value))
-                            max_score = max(max_score, similarity)
-                    
-                    if max_score > 0.6:  # Threshold for similarity
-                        similar_matches.append((user, max_score))
-                
-                # Sort by similarity score and take the top N
-                similar_matches.sort(key=lambda x: x[1], reverse=True)
-                all_matches.extend([match[0] for match in similar_matches[:remaining_needed]])
-            
-            return all_matches[:limit]
-        except Exception as e:
-            logger.error(f"Error in user simple search: {str(e)}")
-            return model.objects.order_by('-date_joined')[:limit]  # Fallback to recent users
-        
+        exact_q = (
+            Q(username__iexact=query) |
+            Q(first_name__iexact=query) |
+            Q(last_name__iexact=query) |
+            Q(email__iexact=query)
+        )
+        partial_q = (
+            Q(username__icontains=query) |
+            Q(first_name__icontains=query) |
+            Q(last_name__icontains=query) |
+            Q(email__icontains=query) |
+            Q(bio__icontains=query)
+        )
+        recency_field = '-date_joined'
     elif model == Post:
-        # For posts, search in title, description, content
-        queryset = model.objects.all()
-        
-        try:
-            # Exact matches - fast lookup
-            exact_matches_post = queryset.filter(
-                Q(title__iexact=query) |
-                Q(description__iexact=query)
-            )[:limit]
+        # For posts, search in title, description
+        exact_q = Q(title__iexact=query) | Q(description__iexact=query)
+        partial_q = Q(title__icontains=query) | Q(description__icontains=query)
+        recency_field = '-created_at'
+    else:
+        # If model not recognized, return empty list
+        logger.warning(f"Unrecognized model in simple_search: {model.__name__}")
+        return []
 
-            # If we have enough exact matches, return them
-            if len(exact_matches_post) >= limit:
-                return exact_matches_post
-            
-            # Partial matches, title and description have higher weight
-            remaining = limit - len(exact_matches_post)
-            partial_matches_post = queryset.filter(
-                Q(title__icontains=query) |
-                Q(description__icontains=query)
-            ).exclude(
-                id__in=[post.id for post in exact_matches_post]
-            )[:remaining]
-            
-            # Combine results
-            all_matches = list(exact_matches_post) + list(partial_matches_post)
-            
-            # If we don't have enough results, do a more relaxed search with string similarity
-            if len(all_matches) < limit:
-                # Get remaining posts - limit to recent posts for performance
-                remaining_needed = limit - len(all_matches)
-                potential_matches = queryset.exclude(
-                    id__in=[post.id for post in all_matches]
-                ).order_by('-created_at')[:300]  # Limit to 300 for performance
-                
-                # Score based on string similarity
-                similar_matches = []
-                for post in potential_matches:
-                    max_score = 0
-                    for field in fields:
-                        field_value = getattr(post, field, "")
-                        if field_value:
-                            similarity = get_string_similarity(query, str(field_value))
-                            max_score = max(max_score, similarity)
-                    
-                    if max_score > 0.6:  # Threshold for similarity
-                        similar_matches.append((post, max_score))
-                
-                # Sort by similarity score and take the top N
-                similar_matches.sort(key=lambda x: x[1], reverse=True)
-                all_matches.extend([match[0] for match in similar_matches[:remaining_needed]])
-            
-            return all_matches[:limit]
-        except Exception as e:
-            logger.error(f"Error in post simple search: {str(e)}")
-            return model.objects.order_by('-created_at')[:limit]  # Fallback to recent posts
-    
-    # If model not recognized, return empty list
-    logger.warning(f"Unrecognized model in simple_search: {model.__name__}")
-    return []
+    queryset = model.objects.all()
+
+    try:
+        # First grab exact matches - fast lookup
+        match_ids = list(queryset.filter(exact_q).values_list('id', flat=True)[:limit])
+
+        # Then partial matches
+        if len(match_ids) < limit:
+            match_ids += list(
+                queryset.filter(partial_q)
+                .exclude(id__in=match_ids)
+                .values_list('id', flat=True)[:limit - len(match_ids)]
+            )
+
+        # If we don't have enough results, do a more relaxed search with string similarity
+        if len(match_ids) < limit:
+            # Only fetch the scored columns of a limited number of candidates
+            remaining_needed = limit - len(match_ids)
+            potential_matches = queryset.exclude(
+                id__in=match_ids
+            ).order_by(recency_field).values('id', *fields)[:300]  # Limit to 300 for performance
+
+            # Score based on string similarity
+            similar_matches = []
+            for row in potential_matches:
+                max_score = 0
+                for field in fields:
+                    field_value = row.get(field)
+                    if field_value:
+                        similarity = get_string_similarity(query, str(field_value))
+                        max_score = max(max_score, similarity)
+
+                if max_score > 0.6:  # Threshold for similarity
+                    similar_matches.append((row['id'], max_score))
+
+            # Sort by similarity score and take the top N
+            similar_matches.sort(key=lambda x: x[1], reverse=True)
+            match_ids += [match[0] for match in similar_matches[:remaining_needed]]
+
+        return _ordered_by_ids(model, match_ids[:limit])
+    except Exception as e:
+        logger.error(f"Error in {model.__name__.lower()} simple search: {str(e)}")
+        # Fallback to the most recent rows
+        return queryset.order_by(recency_field)[:limit]
 
 class SearchViewSet(ViewSet, UsePrimaryDatabaseMixin):
     permission_classes = [IsAuthenticated]
@@ -738,7 +697,7 @@ class SearchViewSet(ViewSet, UsePrimaryDatabaseMixin):
             # Fall back to a simpler query if no results
             if not posts:
                 logger.info(f"No posts found with complex query for '{query}', falling back to simpler search")
-                simple_posts = simple_search(query, Post, ['title', 'description', 'content'], 40)
+                simple_posts = simple_search(query, Post, ['title', 'description'], 40)
                 posts = self._prepare_post_queryset(simple_posts)
             
             # Serialize results
@@ -891,7 +850,7 @@ class SearchViewSet(ViewSet, UsePrimaryDatabaseMixin):
                     # Determine whether to use simple search
                     if use_simple_search:
                         # Use simple search directly
-                        simple_post_results = simple_search(query, Post, ['title', 'description', 'content'], 40)
+                        simple_post_results = simple_search(query, Post, ['title', 'description'], 40)
                         all_posts = PostSerializer(
                             self._prepare_post_queryset(simple_post_results),
                             many=True,
@@ -904,7 +863,7 @@ class SearchViewSet(ViewSet, UsePrimaryDatabaseMixin):
                         # If no results, try simple search as fallback
                         if not all_posts:
                             logger.info(f"Advanced search returned no results for '{query}', trying simple search")
-                            simple_post_results = simple_search(query, Post, ['title', 'description', 'content'], 40)
+                            simple_post_results = simple_search(query, Post, ['title', 'description'], 40)
                             all_posts = PostSerializer(
                                 self._prepare_post_queryset(simple_post_results),
                                 many=True,
@@ -1,6 +1,5 @@
 from django.contrib.auth import get_user_model
 from django.contrib.auth.backends import ModelBackend
-from django.db.models import Q
 
 User = get_user_model()
 
@@ -9,11 +8,16 @@ class EmailOrUsernameModelBackend(ModelBackend):
         if username is None or password is None:
             return None
 
-        try:
-            user = User.objects.get(Q(username=username) | Q(email=username))
-            if user.check_password(password):
-                return user
-        except User.DoesNotExist:
-            return None
+        # Two exact lookups, each served by its own unique index, instead of
+        # one OR query. Try the likelier column first.
+        lookups = ('email', 'username') if '@' in username else ('username', 'email')
+        user = None
+        for field in lookups:
+            user = User.objects.filter(**{field: username}).first()
+            if user is not None:
+                break
+
+        if user is not None and user.check_password(password):
+            return user
 
-        return None
\ No newline at end of file
+        return None
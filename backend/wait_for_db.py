@@ -1,13 +1,13 @@
 import os
 import time
-import psycopg2
+import psycopg
 
 def wait_for_db():
     """Wait for database to be available"""
     print("Waiting for database...")
     while True:
         try:
-            psycopg2.connect(
+            psycopg.connect(
                 dbname=os.environ.get('POSTGRES_DB'),
                 user=os.environ.get('POSTGRES_USER'),
                 password=os.environ.get('POSTGRES_PASSWORD'),
@@ -15,7 +15,7 @@ def wait_for_db():
                 port=os.environ.get('POSTGRES_PORT', 5432)
             )
             break
-        except psycopg2.OperationalError:
+        except psycopg.OperationalError:
             print("Database unavailable, waiting 1 second...")
             time.sleep(1)
     print("Database available!")